@@ -0,0 +1,143 @@
+"""
+Admission control
+Every API request is assigned a cost class (cheap, moderate, expensive) by
+endpoint, see Config.ADMISSION_*. Each class has its own concurrency limit
+and bounded wait queue, so a burst of heavy requests can only hold a fixed
+share of the worker threads and cheap lookups keep their latency.
+
+A request that finds its class queue full, or that is still queued when its
+deadline passes, is shed with 503 and a Retry-After header. Python threads
+cannot be interrupted, so a request that has started always runs to the end;
+finishing past its deadline is only counted (overran).
+"""
+import threading
+import time
+from flask import g, jsonify, request
+from config import Config
+
+
+class CostClass:
+    """Concurrency pool and wait queue for one cost class"""
+
+    def __init__(self, name, concurrency, queue, deadline_s, retry_after_s):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.deadline_s = deadline_s
+        self.retry_after_s = retry_after_s
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.completed = 0
+        self.overran = 0
+
+    def acquire(self, deadline):
+        """Take a slot, waiting until deadline. Returns None or the reason for shedding."""
+        with self._cond:
+            # Newcomers queue behind existing waiters instead of taking a slot just released to them
+            if self.in_flight < self.concurrency and not self.queued:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            if self.queued >= self.queue:
+                self.shed_queue_full += 1
+                return 'queue_full'
+
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                while self.in_flight >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed_deadline += 1
+                        return 'deadline'
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            finally:
+                self.queued -= 1
+
+    def release(self, overran):
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            if overran:
+                self.overran += 1
+            self._cond.notify()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'concurrency': self.concurrency,
+                'queue_limit': self.queue,
+                'deadline_s': self.deadline_s,
+                'in_flight': self.in_flight,
+                'queue_depth': self.queued,
+                'max_queue_depth': self.max_queued,
+                'admitted': self.admitted,
+                'completed': self.completed,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_deadline': self.shed_deadline,
+                'overran': self.overran,
+            }
+
+
+class AdmissionController:
+    def __init__(self, classes=None, endpoint_classes=None, default_class=None,
+                 escalations=None, exempt=None):
+        classes = classes or Config.ADMISSION_CLASSES
+        self.classes = {name: CostClass(name, **limits) for name, limits in classes.items()}
+        self.endpoint_classes = endpoint_classes or Config.ADMISSION_ENDPOINT_CLASSES
+        self.default_class = default_class or Config.ADMISSION_DEFAULT_CLASS
+        self.escalations = escalations or Config.ADMISSION_ESCALATIONS
+        self.exempt = set(exempt or Config.ADMISSION_EXEMPT_ENDPOINTS)
+
+    def classify(self, endpoint, args):
+        """Cost class name for a request, or None if it bypasses admission control"""
+        if endpoint is None or endpoint in self.exempt:
+            return None
+        for arg, threshold, cost_class in self.escalations.get(endpoint, ()):
+            try:
+                if float(args.get(arg, 0)) > threshold:
+                    return cost_class
+            except ValueError:
+                pass
+        return self.endpoint_classes.get(endpoint, self.default_class)
+
+    def init_app(self, app):
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+        app.extensions['admission'] = self
+
+    def _admit(self):
+        name = self.classify(request.endpoint, request.args)
+        if name is None:
+            return None
+
+        cost_class = self.classes[name]
+        g.admission_deadline = time.monotonic() + cost_class.deadline_s
+        reason = cost_class.acquire(g.admission_deadline)
+        if reason is not None:
+            response = jsonify({
+                'status': 'error',
+                'message': f'Server busy ({name} requests {reason.replace("_", " ")}), retry later'
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(cost_class.retry_after_s)
+            return response
+
+        g.admission_class = cost_class
+        return None
+
+    def _release(self, exc=None):
+        cost_class = g.pop('admission_class', None)
+        if cost_class is not None:
+            cost_class.release(time.monotonic() > g.admission_deadline)
+
+    def metrics(self):
+        return {name: cost_class.metrics() for name, cost_class in self.classes.items()}
@@ -4,6 +4,9 @@ Routes package initialization and registration
 from .counties import counties_bp
 from .water_quality import water_quality_bp
 from .treatment_plants import treatment_plants_bp
+from .search import search_bp
+from .export import export_bp
+from .query import query_bp
 
 def register_routes(app):
     """Register all API blueprints with the Flask app"""
@@ -11,4 +14,7 @@ def register_routes(app):
     
     app.register_blueprint(counties_bp, url_prefix=Config.API_PREFIX)
     app.register_blueprint(water_quality_bp, url_prefix=Config.API_PREFIX)
-    app.register_blueprint(treatment_plants_bp, url_prefix=Config.API_PREFIX) 
\ No newline at end of file
+    app.register_blueprint(treatment_plants_bp, url_prefix=Config.API_PREFIX)
+    app.register_blueprint(search_bp, url_prefix=Config.API_PREFIX)
+    app.register_blueprint(export_bp, url_prefix=Config.API_PREFIX)
+    app.register_blueprint(query_bp, url_prefix=Config.API_PREFIX) 
\ No newline at end of file
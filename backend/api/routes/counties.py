@@ -3,10 +3,11 @@ Counties API endpoints
 Handles California county data and boundaries
 """
 from flask import Blueprint, jsonify, request
-from api.services.data_service import DataService
+from api.services.data_service import data_service
+from api.services.choropleth_service import ChoroplethService, CHOROPLETH_METRICS
 
 counties_bp = Blueprint('counties', __name__)
-data_service = DataService()
+choropleth_service = ChoroplethService()
 
 @counties_bp.route('/counties', methods=['GET'])
 def get_all_counties():
@@ -60,6 +61,31 @@ def get_county_boundaries():
             'message': str(e)
         }), 500
 
+@counties_bp.route('/counties/choropleth', methods=['GET'])
+def get_county_choropleth():
+    """Get county TopoJSON with a metric value and class break per county"""
+    try:
+        metric = request.args.get('metric', 'lead_avg_ug_per_L')
+        if metric not in CHOROPLETH_METRICS:
+            return jsonify({
+                'status': 'error',
+                'message': f'metric must be one of: {", ".join(CHOROPLETH_METRICS)}'
+            }), 400
+        
+        choropleth = choropleth_service.get_choropleth(metric)
+        return jsonify({
+            'status': 'success',
+            'data': choropleth['topology'],
+            'metric': metric,
+            'breaks': choropleth['breaks'],
+            'data_version': choropleth['data_version']
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @counties_bp.route('/counties/population', methods=['GET'])
 def get_population_data():
     """Get population data for all counties"""
@@ -0,0 +1,78 @@
+"""
+Bulk export API endpoints
+Streams full datasets as CSV, Parquet or FlatGeobuf
+"""
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from api.services.export_service import ExportService, ExportUnavailable, EXPORT_DATASETS, MIMETYPES
+
+export_bp = Blueprint('export', __name__)
+export_service = ExportService()
+
+def _filters(dataset):
+    """Filters from the same query args the JSON endpoints accept"""
+    if dataset == 'population':
+        return {
+            'sort_by': request.args.get('sort_by', 'county_name'),
+            'order': request.args.get('order', 'asc')
+        }
+    if dataset == 'water-quality':
+        filters = {
+            'max_lead': request.args.get('max_lead', type=float),
+            'max_arsenic': request.args.get('max_arsenic', type=float),
+            'max_nitrate': request.args.get('max_nitrate', type=float)
+        }
+        return {key: value for key, value in filters.items() if value is not None}
+    if dataset == 'treatment-plants':
+        filters = {
+            'county': request.args.get('county'),
+            'public_access': request.args.get('public_access', type=bool)
+        }
+        return {key: value for key, value in filters.items() if value}
+    return {}
+
+@export_bp.route('/export/<dataset>.<any(csv, parquet, fgb):fmt>', methods=['GET'])
+def export_dataset(dataset, fmt):
+    """Export a dataset in the requested format"""
+    try:
+        if dataset not in EXPORT_DATASETS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Unknown dataset "{dataset}"'
+            }), 404
+        
+        formats = EXPORT_DATASETS[dataset][1]
+        if fmt not in formats:
+            return jsonify({
+                'status': 'error',
+                'message': f'{dataset} can be exported as: {", ".join(formats)}'
+            }), 400
+        
+        filters = _filters(dataset)
+        download_name = f'{dataset}.{fmt}'
+        
+        if fmt == 'csv':
+            return Response(
+                stream_with_context(export_service.stream_csv(dataset, filters)),
+                mimetype=MIMETYPES[fmt],
+                headers={'Content-Disposition': f'attachment; filename={download_name}'}
+            )
+        
+        path = export_service.export_file(dataset, fmt, filters)
+        return send_file(
+            path,
+            mimetype=MIMETYPES[fmt],
+            as_attachment=True,
+            download_name=download_name,
+            conditional=True,
+            etag=True
+        )
+    except ExportUnavailable as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 501
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,78 @@
+"""
+Query API endpoints
+Read-only, parameterized SQL over the embedded engine (Config.SQL_ENGINE)
+"""
+import json
+import time
+from flask import Blueprint, jsonify, request
+from config import Config
+from api.services.data_service import data_service
+from api.services.sql_engine import EngineUnavailable, QueryError, QueryTimeout
+
+query_bp = Blueprint('query', __name__)
+
+def _query_arguments():
+    """sql and params from a JSON body (POST) or the query string (GET, params as JSON)"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        return body.get('sql'), body.get('params')
+    params = request.args.get('params')
+    return request.args.get('sql'), json.loads(params) if params else None
+
+@query_bp.route('/query', methods=['GET', 'POST'])
+def run_query():
+    """Run one read-only SQL statement against population, water_quality and treatment_plants"""
+    try:
+        try:
+            sql, params = _query_arguments()
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'params must be a JSON array or object'
+            }), 400
+        
+        if not sql or not isinstance(sql, str):
+            return jsonify({
+                'status': 'error',
+                'message': 'sql parameter is required'
+            }), 400
+        
+        if params is not None and not isinstance(params, (list, dict)):
+            return jsonify({
+                'status': 'error',
+                'message': 'params must be a JSON array or object'
+            }), 400
+        
+        engine = data_service.sql_engine
+        start = time.perf_counter()
+        columns, rows, truncated = engine.query(
+            sql, params, max_rows=Config.SQL_MAX_ROWS, timeout=Config.SQL_QUERY_TIMEOUT_S
+        )
+        return jsonify({
+            'status': 'success',
+            'columns': columns,
+            'data': [list(row) for row in rows],
+            'count': len(rows),
+            'truncated': truncated,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+    except EngineUnavailable as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 501
+    except QueryTimeout as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 408
+    except QueryError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
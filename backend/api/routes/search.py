@@ -0,0 +1,49 @@
+"""
+Search API endpoints
+Typeahead search across counties, cities and treatment plants
+"""
+from flask import Blueprint, jsonify, request
+from config import Config
+from api.services.search_service import SearchService, KIND_RANK
+
+search_bp = Blueprint('search', __name__)
+search_service = SearchService()
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """Ranked prefix and typo-tolerant matches for the q parameter"""
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', default=10, type=int), Config.SEARCH_MAX_RESULTS)
+        kind = request.args.get('type')
+        
+        if not query:
+            return jsonify({
+                'status': 'error',
+                'message': 'q parameter is required'
+            }), 400
+        
+        if limit < 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'limit must be at least 1'
+            }), 400
+        
+        if kind and kind not in KIND_RANK:
+            return jsonify({
+                'status': 'error',
+                'message': f'type must be one of: {", ".join(KIND_RANK)}'
+            }), 400
+        
+        results = search_service.search(query, limit=limit, kind=kind)
+        return jsonify({
+            'status': 'success',
+            'data': results,
+            'count': len(results),
+            'query': query
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
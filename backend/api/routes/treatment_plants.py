@@ -2,14 +2,33 @@
 Water Treatment Plants API endpoints
 Handles treatment plant locations and information
 """
-from flask import Blueprint, jsonify, request
-from api.services.data_service import DataService
+import json
+import math
+from flask import Blueprint, current_app, jsonify, request
+from api.services.data_service import data_service
 from api.services.geo_service import GeoService
 
 treatment_plants_bp = Blueprint('treatment_plants', __name__)
-data_service = DataService()
 geo_service = GeoService()
 
+def _coordinates_error(latitude, longitude):
+    """Message for missing or non-finite (nan, inf) coordinates, or None if they are usable"""
+    if latitude is None or longitude is None:
+        return 'latitude and longitude parameters are required'
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return 'latitude and longitude must be finite numbers'
+    return None
+
+def _list_response(data_json, **fields):
+    """Response like jsonify({'data': ..., **fields}) around an already encoded data array"""
+    provider = current_app.json
+    names = sorted([*fields, 'data']) if provider.sort_keys else ['data', *fields]
+    body = ','.join(
+        json.dumps(name) + ':' + (data_json if name == 'data' else provider.dumps(fields[name]))
+        for name in names
+    )
+    return current_app.response_class('{' + body + '}\n', mimetype=provider.mimetype)
+
 @treatment_plants_bp.route('/treatment-plants', methods=['GET'])
 def get_all_treatment_plants():
     """Get all water treatment plants"""
@@ -17,16 +36,13 @@ def get_all_treatment_plants():
         county_filter = request.args.get('county')
         public_access_only = request.args.get('public_access', type=bool)
         
-        plants_data = data_service.get_treatment_plants(
+        count, plants_json = data_service.get_treatment_plants_json(
             county_filter=county_filter,
-            public_access_only=public_access_only
+            public_access_only=public_access_only,
+            sort_keys=current_app.json.sort_keys
         )
         
-        return jsonify({
-            'status': 'success',
-            'data': plants_data,
-            'count': len(plants_data)
-        })
+        return _list_response(plants_json, status='success', count=count)
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -38,10 +54,10 @@ def get_treatment_plant(facility_id):
     """Get specific treatment plant by facility ID"""
     try:
         plant_data = data_service.get_treatment_plant_by_id(facility_id)
-        if plant_data:
+        if plant_data is not None:
             return jsonify({
                 'status': 'success',
-                'data': plant_data
+                'data': plant_data.to_dict()
             })
         else:
             return jsonify({
@@ -62,10 +78,17 @@ def get_nearby_treatment_plants():
         longitude = request.args.get('lng', type=float)
         radius_km = request.args.get('radius', default=50, type=float)
         
-        if latitude is None or longitude is None:
+        error = _coordinates_error(latitude, longitude)
+        if error is not None:
             return jsonify({
                 'status': 'error',
-                'message': 'latitude and longitude parameters are required'
+                'message': error
+            }), 400
+        
+        if not math.isfinite(radius_km):
+            return jsonify({
+                'status': 'error',
+                'message': 'radius must be a finite number'
             }), 400
         
         nearby_plants = geo_service.find_nearby_treatment_plants(
@@ -89,15 +112,80 @@ def get_nearby_treatment_plants():
 def get_treatment_plants_by_county(county_name):
     """Get all treatment plants in a specific county"""
     try:
-        plants = data_service.get_treatment_plants_by_county(county_name)
+        count, plants_json = data_service.get_treatment_plants_json(
+            county_filter=county_name, sort_keys=current_app.json.sort_keys
+        )
+        return _list_response(plants_json, status='success', count=count, county=county_name)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500 
+
+@treatment_plants_bp.route('/treatment-plants/serving', methods=['GET'])
+def get_serving_treatment_plant():
+    """Find the plant whose grid service area contains the given coordinates"""
+    try:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        
+        error = _coordinates_error(latitude, longitude)
+        if error is not None:
+            return jsonify({
+                'status': 'error',
+                'message': error
+            }), 400
+        
+        plant = geo_service.find_serving_plant(latitude, longitude)
+        if plant is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'No treatment plant serves this location'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'data': plant,
+            'location': {'latitude': latitude, 'longitude': longitude}
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@treatment_plants_bp.route('/treatment-plants/service-areas', methods=['GET'])
+def get_service_areas():
+    """Get grid service area size and worst-case travel cost for every plant"""
+    try:
+        areas = geo_service.get_service_area_summary()
+        return jsonify({
+            'status': 'success',
+            'data': areas,
+            'count': len(areas)
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@treatment_plants_bp.route('/treatment-plants/<int:facility_id>/service-area', methods=['GET'])
+def get_service_area(facility_id):
+    """Get grid service area size and worst-case travel cost for one plant"""
+    try:
+        area = geo_service.get_service_area(facility_id)
+        if area is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Treatment plant with ID {facility_id} not found'
+            }), 404
         return jsonify({
             'status': 'success',
-            'data': plants,
-            'count': len(plants),
-            'county': county_name
+            'data': area
         })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500
@@ -3,10 +3,9 @@ Water Quality API endpoints
 Handles water quality metrics by county
 """
 from flask import Blueprint, jsonify, request
-from api.services.data_service import DataService
+from api.services.data_service import data_service
 
 water_quality_bp = Blueprint('water_quality', __name__)
-data_service = DataService()
 
 @water_quality_bp.route('/water-quality', methods=['GET'])
 def get_all_water_quality():
@@ -0,0 +1,116 @@
+"""
+Choropleth Service
+County TopoJSON joined with a chosen metric and its class breaks
+"""
+import threading
+import numpy as np
+from config import Config
+from api.services.data_service import data_service
+from api.services.single_flight import SingleFlight
+from api.services.topology import Topology
+
+# Data files (Config attribute names) the choropleth is built from
+CHOROPLETH_SOURCES = ['COUNTIES_GEOJSON', 'POPULATION_DATA', 'WATER_QUALITY_DATA']
+
+# Metric name -> (dataset attribute on DataService, column)
+CHOROPLETH_METRICS = {
+    'lead_avg_ug_per_L': ('water_quality_data', 'lead_avg_ug_per_L'),
+    'arsenic_avg_ug_per_L': ('water_quality_data', 'arsenic_avg_ug_per_L'),
+    'nitrate_avg_mg_per_L': ('water_quality_data', 'nitrate_avg_mg_per_L'),
+    'total_population': ('population_data', 'total_population'),
+}
+
+
+def feature_county_name(feature):
+    """County name of a GeoJSON feature, from the first populated COUNTY_NAME_PROPERTIES key"""
+    properties = feature.get('properties') or {}
+    for key in Config.COUNTY_NAME_PROPERTIES:
+        if properties.get(key):
+            return str(properties[key])
+    return None
+
+
+def quantile_breaks(values, classes):
+    """Class boundaries (min, inner quantiles, max) with duplicates removed"""
+    if len(values) == 0:
+        return []
+    breaks = np.quantile(values, np.linspace(0, 1, classes + 1))
+    return sorted(set(round(float(b), 6) for b in breaks))
+
+
+class ChoroplethService:
+    def __init__(self):
+        self.data_service = data_service
+        self._topology = None
+        self._topology_version = None
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def data_version(self):
+        """
+        Version of the boundaries and frames held in memory. They are loaded
+        first, so the version names exactly the data the response is built from;
+        files edited on disk are only picked up after a restart.
+        """
+        self.data_service.county_boundaries
+        self.data_service.population_data
+        self.data_service.water_quality_data
+        return self.data_service.loaded_version(CHOROPLETH_SOURCES)
+
+    def topology(self, version):
+        """County topology, built once per loaded data version"""
+        if self._topology_version != version:
+            self._flight.do(('topology', version), self._build_topology, version)
+        return self._topology
+    
+    def _build_topology(self, version):
+        if self._topology_version != version:
+            self._topology = Topology(
+                self.data_service.county_boundaries, Config.TOPOJSON_QUANTIZATION
+            )
+            self._topology_version = version
+
+    def get_choropleth(self, metric):
+        """TopoJSON with value and class per county, cached per metric and loaded data version"""
+        version = self.data_version()
+        key = (metric, version)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._flight.do(key, self._build, metric, version)
+        with self._cache_lock:
+            # Drop entries for superseded data versions
+            self._cache = {k: v for k, v in self._cache.items() if k[1] == version}
+            self._cache[key] = result
+        return result
+
+    def _build(self, metric, version):
+        dataset, column = CHOROPLETH_METRICS[metric]
+        df = getattr(self.data_service, dataset)
+        values = {
+            str(name).lower(): float(value)
+            for name, value in zip(df['county_name'], df[column])
+        }
+        breaks = quantile_breaks(list(values.values()), Config.CHOROPLETH_CLASSES)
+        inner = breaks[1:-1]
+
+        topology = self.topology(version)
+        properties = []
+        for feature in topology.features:
+            name = feature_county_name(feature)
+            value = values.get(name.lower()) if name else None
+            properties.append({
+                'name': name,
+                'value': value,
+                'class': int(np.searchsorted(inner, value, side='right')) if value is not None else None
+            })
+
+        return {
+            'metric': metric,
+            'breaks': breaks,
+            'data_version': version,
+            'topology': topology.to_topojson(properties)
+        }
@@ -2,49 +2,157 @@
 Data Service
 Handles all data loading, processing, and filtering operations
 """
-import pandas as pd
+import numpy as np
 import json
 import os
 from config import Config
+from api.services.single_flight import SingleFlight
+from api.services.records import ColumnarTable
+from api.services.data_version import data_version, file_digest
+from api.services.sql_engine import create_engine
+from api.services.result_cache import cached
+
+# pandas is imported inside the loaders so that importing the routes (and
+# starting the server) does not pay for it; see STARTUP_MODE in Config
+
+# Source files (Config attribute names) behind cached results. Water quality
+# and plant rows are validated against the population county list.
+COUNTY_SOURCES = ['POPULATION_DATA', 'WATER_QUALITY_DATA']
+WATER_QUALITY_SOURCES = ['POPULATION_DATA', 'WATER_QUALITY_DATA']
+TREATMENT_PLANTS_SOURCES = ['POPULATION_DATA', 'TREATMENT_PLANTS_DATA']
 
 class DataService:
     def __init__(self):
         self._population_data = None
         self._water_quality_data = None
-        self._treatment_plants_data = None
         self._county_boundaries = None
+        self._treatment_plants_table = None
+        self._sql_engine = None
+        self.use_sql = Config.SQL_ENGINE != 'off'
+        self.ingestion_reports = {}
+        self._loaded_digests = {}
+        self._flight = SingleFlight()
+    
+    def _load_once(self, attr, loader):
+        """Run a lazy loader once even when several threads hit the cold path together"""
+        def load():
+            if getattr(self, attr) is None:
+                setattr(self, attr, loader())
+        self._flight.do(attr, load)
+        return getattr(self, attr)
+    
+    def _ingest(self, name, path, schema, **rules):
+        """Typed, validated chunked read of one data file; the report is kept on the service"""
+        from api.services.ingestion import ingest_csv
+        self.note_loaded(path)
+        df, report = ingest_csv(
+            path, schema,
+            chunk_size=Config.CSV_CHUNK_SIZE,
+            max_reported=Config.INGESTION_MAX_REPORTED_ROWS,
+            **rules
+        )
+        self.ingestion_reports[name] = report
+        return df
+    
+    def note_loaded(self, path):
+        """Record the digest of a data file that is about to be read into memory"""
+        digest = file_digest(path)
+        self._loaded_digests[path] = digest
+        return digest
+    
+    def loaded_version(self, sources):
+        """
+        data_version of sources (Config attribute names) as loaded in memory.
+        Files that have not been loaded yet use their current contents, which
+        is what the next load will read. Data is not reloaded when files change,
+        so results derived from it must be keyed on this, not the files on disk.
+        """
+        return data_version([getattr(Config, source) for source in sources], self._loaded_digests)
+    
+    def _known_counties(self):
+        return set(self.population_data['county_name'].astype(str).str.lower())
     
     @property
     def population_data(self):
         """Lazy load population data"""
         if self._population_data is None:
-            self._population_data = pd.read_csv(Config.POPULATION_DATA)
+            self._load_once('_population_data', lambda: self._ingest(
+                'population', Config.POPULATION_DATA, Config.POPULATION_SCHEMA,
+                unique=('county_name',)
+            ))
         return self._population_data
     
     @property
     def water_quality_data(self):
         """Lazy load water quality data"""
         if self._water_quality_data is None:
-            self._water_quality_data = pd.read_csv(Config.WATER_QUALITY_DATA)
+            self._load_once('_water_quality_data', lambda: self._ingest(
+                'water_quality', Config.WATER_QUALITY_DATA, Config.WATER_QUALITY_SCHEMA,
+                unique=('county_name',),
+                known_values={'county_name': self._known_counties()}
+            ))
         return self._water_quality_data
     
+    @property
+    def treatment_plants_table(self):
+        """
+        Lazy load treatment plants as a ColumnarTable. The table is the only
+        resident copy; the DataFrame read from the CSV is dropped after conversion.
+        """
+        if self._treatment_plants_table is None:
+            self._load_once('_treatment_plants_table', self._read_treatment_plants)
+        return self._treatment_plants_table
+    
+    def _read_treatment_plants(self):
+        df = self._ingest(
+            'treatment_plants', Config.TREATMENT_PLANTS_DATA, Config.TREATMENT_PLANTS_SCHEMA,
+            unique=('facility_id',),
+            bounds={
+                'latitude': Config.CA_LATITUDE_BOUNDS,
+                'longitude': Config.CA_LONGITUDE_BOUNDS
+            },
+            known_values={'county': self._known_counties()}
+        )
+        return ColumnarTable.from_frame(df, categorical=Config.TREATMENT_PLANTS_CATEGORICAL_COLUMNS)
+    
     @property
     def treatment_plants_data(self):
-        """Lazy load treatment plants data"""
-        if self._treatment_plants_data is None:
-            self._treatment_plants_data = pd.read_csv(Config.TREATMENT_PLANTS_DATA)
-        return self._treatment_plants_data
+        """Treatment plants as a new DataFrame built from the table (not kept resident)"""
+        return self.treatment_plants_table.to_frame()
+    
+    @property
+    def sql_engine(self):
+        """Embedded SQL copy of the tables (Config.SQL_ENGINE), loaded once from the DataFrames"""
+        if self._sql_engine is None:
+            self._load_once('_sql_engine', lambda: create_engine(Config.SQL_ENGINE, {
+                'population': self.population_data,
+                'water_quality': self.water_quality_data,
+                'treatment_plants': self.treatment_plants_data,
+            }))
+        return self._sql_engine
     
     @property
     def county_boundaries(self):
         """Lazy load county boundaries GeoJSON"""
         if self._county_boundaries is None:
-            with open(Config.COUNTIES_GEOJSON, 'r') as f:
-                self._county_boundaries = json.load(f)
+            self._load_once('_county_boundaries', self._read_county_boundaries)
         return self._county_boundaries
     
+    def _read_county_boundaries(self):
+        self.note_loaded(Config.COUNTIES_GEOJSON)
+        with open(Config.COUNTIES_GEOJSON, 'r') as f:
+            return json.load(f)
+    
+    @cached('all_counties', COUNTY_SOURCES)
     def get_all_counties(self):
         """Get all counties with basic information"""
+        return self._flight.do('all_counties', self._merge_counties)
+    
+    def _merge_counties(self):
+        if self.use_sql:
+            return self.sql_engine.records(self._counties_sql() + ' ORDER BY p.rowid')
+        
+        import pandas as pd
         population = self.population_data
         water_quality = self.water_quality_data
         
@@ -58,8 +166,25 @@ class DataService:
         
         return merged.to_dict('records')
     
+    def _counties_sql(self):
+        """Population joined with water quality, same columns as the pandas merge"""
+        columns = [f'p."{c}"' for c in self.population_data.columns] + [
+            f'w."{c}"' for c in self.water_quality_data.columns if c != 'county_name'
+        ]
+        return (
+            f'SELECT {", ".join(columns)} FROM population p '
+            'JOIN water_quality w ON w.county_name = p.county_name'
+        )
+    
     def get_county_by_name(self, county_name):
         """Get specific county data"""
+        if self.use_sql:
+            rows = self.sql_engine.records(
+                self._counties_sql() + ' WHERE lower(p.county_name) = lower(?) ORDER BY p.rowid LIMIT 1',
+                (county_name,)
+            )
+            return rows[0] if rows else None
+        
         counties_data = self.get_all_counties()
         for county in counties_data:
             if county['county_name'].lower() == county_name.lower():
@@ -70,19 +195,31 @@ class DataService:
         """Get county boundaries GeoJSON"""
         return self.county_boundaries
     
-    def get_population_data(self, sort_by='county_name', order='asc'):
-        """Get population data with optional sorting"""
-        df = self.population_data.copy()
+    def sorted_population_frame(self, sort_by='county_name', order='asc'):
+        """Population DataFrame with optional sorting"""
+        df = self.population_data
         
         if sort_by in df.columns:
             ascending = (order.lower() == 'asc')
             df = df.sort_values(by=sort_by, ascending=ascending)
         
-        return df.to_dict('records')
+        return df
     
-    def get_water_quality_data(self, max_lead=None, max_arsenic=None, max_nitrate=None):
-        """Get water quality data with optional filtering"""
-        df = self.water_quality_data.copy()
+    @cached('population', ['POPULATION_DATA'])
+    def get_population_data(self, sort_by='county_name', order='asc'):
+        """Get population data with optional sorting"""
+        if self.use_sql:
+            order_by = 'rowid'
+            if sort_by in self.population_data.columns:
+                direction = 'ASC' if order.lower() == 'asc' else 'DESC'
+                order_by = f'"{sort_by}" {direction}, rowid'
+            return self.sql_engine.records(f'SELECT * FROM population ORDER BY {order_by}')
+        
+        return self.sorted_population_frame(sort_by, order).to_dict('records')
+    
+    def filtered_water_quality_frame(self, max_lead=None, max_arsenic=None, max_nitrate=None):
+        """Water quality DataFrame with optional maximum-contaminant filters"""
+        df = self.water_quality_data
         
         # Apply filters if provided
         if max_lead is not None:
@@ -92,10 +229,33 @@ class DataService:
         if max_nitrate is not None:
             df = df[df['nitrate_avg_mg_per_L'] <= max_nitrate]
         
-        return df.to_dict('records')
+        return df
+    
+    @cached('water_quality', WATER_QUALITY_SOURCES)
+    def get_water_quality_data(self, max_lead=None, max_arsenic=None, max_nitrate=None):
+        """Get water quality data with optional filtering"""
+        if self.use_sql:
+            conditions, params = [], []
+            for column, limit in (('lead_avg_ug_per_L', max_lead),
+                                  ('arsenic_avg_ug_per_L', max_arsenic),
+                                  ('nitrate_avg_mg_per_L', max_nitrate)):
+                if limit is not None:
+                    conditions.append(f'"{column}" <= ?')
+                    params.append(limit)
+            where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+            return self.sql_engine.records(f'SELECT * FROM water_quality{where} ORDER BY rowid', params)
+        
+        return self.filtered_water_quality_frame(max_lead, max_arsenic, max_nitrate).to_dict('records')
     
     def get_county_water_quality(self, county_name):
         """Get water quality data for specific county"""
+        if self.use_sql:
+            rows = self.sql_engine.records(
+                'SELECT * FROM water_quality WHERE lower(county_name) = lower(?) ORDER BY rowid LIMIT 1',
+                (county_name,)
+            )
+            return rows[0] if rows else None
+        
         df = self.water_quality_data
         county_data = df[df['county_name'].str.lower() == county_name.lower()]
         
@@ -103,6 +263,7 @@ class DataService:
             return county_data.iloc[0].to_dict()
         return None
     
+    @cached('water_quality_statistics', WATER_QUALITY_SOURCES)
     def get_water_quality_statistics(self):
         """Get statistical summary of water quality metrics"""
         df = self.water_quality_data
@@ -133,8 +294,21 @@ class DataService:
         
         return stats
     
+    @cached('worst_water_quality', WATER_QUALITY_SOURCES)
     def get_worst_water_quality_counties(self, limit=10):
         """Get counties with worst water quality for each contaminant"""
+        if self.use_sql:
+            return {
+                key: self.sql_engine.records(
+                    f'SELECT county_name, "{column}" FROM water_quality WHERE "{column}" IS NOT NULL '
+                    f'ORDER BY "{column}" DESC, rowid LIMIT ?',
+                    (limit,)
+                )
+                for key, column in (('highest_lead', 'lead_avg_ug_per_L'),
+                                    ('highest_arsenic', 'arsenic_avg_ug_per_L'),
+                                    ('highest_nitrate', 'nitrate_avg_mg_per_L'))
+            }
+        
         df = self.water_quality_data
         
         worst_counties = {
@@ -145,29 +319,42 @@ class DataService:
         
         return worst_counties
     
-    def get_treatment_plants(self, county_filter=None, public_access_only=False):
-        """Get treatment plants with optional filtering"""
-        df = self.treatment_plants_data.copy()
+    def treatment_plants_mask(self, county_filter=None, public_access_only=False):
+        """Boolean row mask over the treatment plants for the given filters"""
+        table = self.treatment_plants_table
+        mask = np.ones(len(table), dtype=bool)
         
         if county_filter:
-            df = df[df['county'].str.lower() == county_filter.lower()]
+            mask &= table.equals_ignore_case('county', county_filter)
         
         if public_access_only:
-            df = df[df['public_access'].str.lower() == 'yes']
+            mask &= table.equals_ignore_case('public_access', 'yes')
         
-        return df.to_dict('records')
+        return mask
+    
+    @cached('treatment_plants', TREATMENT_PLANTS_SOURCES)
+    def get_treatment_plants(self, county_filter=None, public_access_only=False):
+        """Get treatment plants with optional filtering"""
+        mask = self.treatment_plants_mask(county_filter, public_access_only)
+        return self.treatment_plants_table.take(mask).to_records()
+    
+    @cached('treatment_plants_json', TREATMENT_PLANTS_SOURCES)
+    def get_treatment_plants_json(self, county_filter=None, public_access_only=False, sort_keys=False):
+        """Filtered treatment plants as [count, JSON array text], serialized column-wise"""
+        mask = self.treatment_plants_mask(county_filter, public_access_only)
+        table = self.treatment_plants_table.take(mask)
+        return [len(table), table.to_json(sort_keys=sort_keys)]
     
     def get_treatment_plant_by_id(self, facility_id):
-        """Get specific treatment plant by facility ID"""
-        df = self.treatment_plants_data
-        plant_data = df[df['facility_id'] == facility_id]
-        
-        if not plant_data.empty:
-            return plant_data.iloc[0].to_dict()
-        return None
+        """Get specific treatment plant by facility ID (a RecordView, or None)"""
+        return self.treatment_plants_table.find('facility_id', facility_id)
     
     def get_treatment_plants_by_county(self, county_name):
         """Get all treatment plants in a specific county"""
-        df = self.treatment_plants_data
-        county_plants = df[df['county'].str.lower() == county_name.lower()]
-        return county_plants.to_dict('records') 
\ No newline at end of file
+        table = self.treatment_plants_table
+        return table.take(table.equals_ignore_case('county', county_name)).to_records()
+
+
+# One instance per worker, shared by every blueprint and service, so each
+# dataset is loaded and held in memory once
+data_service = DataService()
@@ -0,0 +1,47 @@
+"""
+Data Version
+Content hashes of the source data files, used to key caches and exports
+"""
+import hashlib
+import os
+import threading
+
+_digest_cache = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of a data file, memoized on (mtime, size). Missing files hash as 'missing'"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 'missing'
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        cached = _digest_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[path] = (signature, digest)
+    return digest
+
+
+def data_version(paths, digests=None):
+    """
+    Combined short hash of several data files. digests maps a path to the
+    digest to use instead of the file's current one (e.g. as it was loaded).
+    """
+    digests = digests or {}
+    sha = hashlib.sha256()
+    for path in sorted(paths):
+        sha.update(os.path.basename(path).encode())
+        sha.update((digests.get(path) or file_digest(path)).encode())
+    return sha.hexdigest()[:16]
@@ -0,0 +1,220 @@
+"""
+Export Service
+Bulk dataset export as CSV, Parquet and FlatGeobuf.
+CSV is streamed chunk by chunk. Parquet and FlatGeobuf are written chunk by
+chunk to a file cache keyed by dataset, filters and loaded data version, so
+they can be served with HTTP range support and reused by later requests.
+The cache is bounded in bytes and files; least recently used files go first.
+pyarrow (Parquet) and fiona (FlatGeobuf) are optional dependencies.
+"""
+import hashlib
+import json
+import os
+import uuid
+from config import Config
+from api.services.data_service import data_service, WATER_QUALITY_SOURCES, TREATMENT_PLANTS_SOURCES
+from api.services.single_flight import SingleFlight
+from api.services.choropleth_service import feature_county_name
+
+# Dataset -> (data files it is built from, supported formats)
+EXPORT_DATASETS = {
+    'population': (['POPULATION_DATA'], ('csv', 'parquet')),
+    'water-quality': (WATER_QUALITY_SOURCES, ('csv', 'parquet')),
+    'treatment-plants': (TREATMENT_PLANTS_SOURCES, ('csv', 'parquet', 'fgb')),
+    'counties': (['COUNTIES_GEOJSON', 'POPULATION_DATA', 'WATER_QUALITY_DATA'], ('fgb',)),
+}
+
+# Part of every cached file's key; bump when the written layout changes so
+# files left in EXPORT_CACHE_DIR by an older version are rebuilt
+# (2: FlatGeobuf layers are named after the dataset)
+EXPORT_LAYOUT_VERSION = 2
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'fgb': 'application/flatgeobuf',
+}
+
+
+class ExportUnavailable(Exception):
+    """Raised when the optional library for an export format is not installed"""
+
+
+def _fiona_type(dtype):
+    import pandas as pd
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float'
+    return 'str'
+
+
+class ExportService:
+    def __init__(self):
+        self.data_service = data_service
+        self._flight = SingleFlight()
+
+    def frame(self, dataset, filters):
+        """Filtered DataFrame for a tabular dataset"""
+        if dataset == 'population':
+            return self.data_service.sorted_population_frame(
+                filters.get('sort_by', 'county_name'), filters.get('order', 'asc')
+            )
+        if dataset == 'water-quality':
+            return self.data_service.filtered_water_quality_frame(
+                filters.get('max_lead'), filters.get('max_arsenic'), filters.get('max_nitrate')
+            )
+        if dataset == 'treatment-plants':
+            mask = self.data_service.treatment_plants_mask(
+                filters.get('county'), filters.get('public_access', False)
+            )
+            return self.data_service.treatment_plants_table.take(mask).to_frame()
+        raise ValueError(f'{dataset} has no tabular export')
+
+    def _chunks(self, df):
+        size = Config.EXPORT_CHUNK_ROWS
+        for start in range(0, len(df), size):
+            yield df.iloc[start:start + size]
+
+    def stream_csv(self, dataset, filters):
+        """
+        Generator of CSV text, one chunk of rows at a time. The frame is built
+        before returning, so a failure surfaces as an error response rather
+        than a truncated 200.
+        """
+        df = self.frame(dataset, filters)
+
+        def generate():
+            yield ','.join(map(str, df.columns)) + '\n'
+            for chunk in self._chunks(df):
+                yield chunk.to_csv(index=False, header=False)
+        return generate()
+
+    def export_file(self, dataset, fmt, filters):
+        """Path to a cached Parquet/FlatGeobuf export, writing it first if needed"""
+        sources, _ = EXPORT_DATASETS[dataset]
+        version = self.data_service.loaded_version(sources)
+        key = json.dumps([dataset, fmt, sorted(filters.items()), version, EXPORT_LAYOUT_VERSION], default=str)
+        name = hashlib.sha256(key.encode()).hexdigest()[:24]
+        path = os.path.join(Config.EXPORT_CACHE_DIR, f'{dataset}-{name}.{fmt}')
+
+        if os.path.exists(path):
+            # Mark as recently used for eviction
+            os.utime(path)
+        else:
+            self._flight.do(path, self._write_export, path, dataset, fmt, filters)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep):
+        """Delete least recently used exports past EXPORT_CACHE_MAX_BYTES / EXPORT_CACHE_MAX_FILES"""
+        files = []
+        with os.scandir(Config.EXPORT_CACHE_DIR) as entries:
+            for entry in entries:
+                # Skip in-progress temp files (.<uuid>.<fmt>)
+                if entry.is_file() and not entry.name.startswith('.'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        count = len(files)
+        for _, size, path in files:
+            if total <= Config.EXPORT_CACHE_MAX_BYTES and count <= Config.EXPORT_CACHE_MAX_FILES:
+                break
+            if os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
+
+    def _write_export(self, path, dataset, fmt, filters):
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # GDAL refuses to overwrite files, so only reserve a unique name here
+        tmp_path = os.path.join(os.path.dirname(path), f'.{uuid.uuid4().hex}.{fmt}')
+        try:
+            if fmt == 'parquet':
+                self._write_parquet(tmp_path, self.frame(dataset, filters))
+            elif dataset == 'counties':
+                self._write_county_fgb(tmp_path)
+            else:
+                self._write_plants_fgb(tmp_path, self.frame(dataset, filters))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write_parquet(self, path, df):
+        """One Parquet row group per EXPORT_CHUNK_ROWS rows"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportUnavailable('Parquet export requires pyarrow')
+
+        # Object columns need real values for type inference, so use the first chunk
+        schema = pa.Schema.from_pandas(df.iloc[:Config.EXPORT_CHUNK_ROWS], preserve_index=False)
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for chunk in self._chunks(df):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+    def _open_fgb(self, path, layer, geometry_type, properties):
+        """FlatGeobuf writer; the layer is named after the dataset, not the temporary file"""
+        try:
+            import fiona
+        except ImportError:
+            raise ExportUnavailable('FlatGeobuf export requires fiona')
+
+        return fiona.open(
+            path, 'w', driver='FlatGeobuf', crs='EPSG:4326', layer=layer,
+            schema={'geometry': geometry_type, 'properties': properties},
+            SPATIAL_INDEX='YES'
+        )
+
+    def _write_plants_fgb(self, path, df):
+        """Point layer of treatment plants with a packed Hilbert R-tree index"""
+        attributes = [c for c in df.columns if c not in ('latitude', 'longitude')]
+        properties = {c: _fiona_type(df[c].dtype) for c in attributes}
+        with self._open_fgb(path, 'treatment-plants', 'Point', properties) as layer:
+            for chunk in self._chunks(df):
+                # Widen float32 coordinates through their shortest repr (37.6017, not 37.60169982)
+                lngs = chunk['longitude'].to_numpy().astype(str).astype(float).tolist()
+                lats = chunk['latitude'].to_numpy().astype(str).astype(float).tolist()
+                rows = chunk[attributes].astype(object).where(chunk[attributes].notna(), None)
+                layer.writerecords(
+                    {
+                        'geometry': {'type': 'Point', 'coordinates': (lng, lat)},
+                        'properties': dict(zip(attributes, values)),
+                    }
+                    for lng, lat, values in zip(lngs, lats, rows.itertuples(index=False, name=None))
+                )
+
+    def _write_county_fgb(self, path):
+        """County polygons with population and water quality attributes"""
+        merged = {
+            str(county['county_name']).lower(): county
+            for county in self.data_service.get_all_counties()
+        }
+        metric_columns = [
+            'total_population', 'lead_avg_ug_per_L', 'arsenic_avg_ug_per_L',
+            'nitrate_avg_mg_per_L', 'data_year'
+        ]
+        properties = {'name': 'str', 'total_population': 'int', 'data_year': 'int'}
+        properties.update({c: 'float' for c in metric_columns if c not in properties})
+
+        with self._open_fgb(path, 'counties', 'MultiPolygon', properties) as layer:
+            for feature in self.data_service.county_boundaries.get('features', []):
+                geometry = feature.get('geometry')
+                if not geometry:
+                    continue
+                if geometry['type'] == 'Polygon':
+                    geometry = {'type': 'MultiPolygon', 'coordinates': [geometry['coordinates']]}
+                name = feature_county_name(feature)
+                county = merged.get(name.lower(), {}) if name else {}
+                values = {'name': name}
+                values.update({c: county.get(c) for c in metric_columns})
+                layer.write({'geometry': geometry, 'properties': values})
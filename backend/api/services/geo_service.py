@@ -2,13 +2,36 @@
 Geographic Service
 Handles geographic calculations and spatial operations
 """
-import pandas as pd
+import logging
+import os
+import numpy as np
 from math import radians, sin, cos, sqrt, atan2
-from api.services.data_service import DataService
+from config import Config
+from api.services.data_service import data_service, TREATMENT_PLANTS_SOURCES
+from api.services.result_cache import cached
+from api.services.single_flight import SingleFlight
+from api.services.service_area_service import (
+    ServiceAreaGrid, boundary_rings, grid_shape, load_cost_surface, polygon_mask
+)
+
+logger = logging.getLogger(__name__)
+
+SERVICE_AREA_SOURCES = TREATMENT_PLANTS_SOURCES + ['SERVICE_AREA_COST_SURFACE', 'COUNTIES_GEOJSON']
+
+def land_rings(data_service):
+    """County boundary rings, or the coarse state outline when the GeoJSON is not available"""
+    if os.path.exists(Config.COUNTIES_GEOJSON):
+        rings = boundary_rings(data_service.county_boundaries)
+        if rings:
+            return rings
+        logger.warning('service areas: no polygons in %s; using the fallback outline', Config.COUNTIES_GEOJSON)
+    return [np.array(Config.SERVICE_AREA_FALLBACK_OUTLINE, dtype=np.float64)]
 
 class GeoService:
     def __init__(self):
-        self.data_service = DataService()
+        self.data_service = data_service
+        self._flight = SingleFlight()
+        self._service_area_grid = None
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """
@@ -31,21 +54,105 @@ class GeoService:
         
         return distance
     
+    def nearby_search_key(self, lat, lng, radius_km):
+        """
+        Normalized key for a nearby search. With NEARBY_COORD_DECIMALS set,
+        coordinates are snapped to that grid so near-identical clicks share work.
+        """
+        decimals = Config.NEARBY_COORD_DECIMALS
+        if decimals is not None:
+            lat, lng = round(lat, decimals), round(lng, decimals)
+        return ('nearby', float(lat), float(lng), float(radius_km))
+    
     def find_nearby_treatment_plants(self, lat, lng, radius_km):
         """Find treatment plants within radius of given coordinates"""
-        plants_df = self.data_service.treatment_plants_data.copy()
-        
-        # Calculate distances
-        plants_df['distance_km'] = plants_df.apply(
-            lambda row: self.calculate_distance(
-                lat, lng, row['latitude'], row['longitude']
-            ), axis=1
+        key = self.nearby_search_key(lat, lng, radius_km)
+        _, lat, lng, radius_km = key
+        return self._flight.do(key, self._search_nearby, lat, lng, radius_km)
+    
+    def haversine_km(self, lat, lng, lats, lngs):
+        """Vectorized great circle distance from one point to arrays of points, in km"""
+        lat1, lon1 = np.radians(lat), np.radians(lng)
+        lat2, lon2 = np.radians(lats), np.radians(lngs)
+        a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+        return 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    
+    @cached('nearby', TREATMENT_PLANTS_SOURCES)
+    def _search_nearby(self, lat, lng, radius_km):
+        plants = self.data_service.treatment_plants_table
+        distances = self.haversine_km(
+            lat, lng,
+            plants.float64_column('latitude'),
+            plants.float64_column('longitude')
         )
         
-        # Filter by radius
-        nearby_plants = plants_df[plants_df['distance_km'] <= radius_km]
-        
-        # Sort by distance
-        nearby_plants = nearby_plants.sort_values('distance_km')
+        # Filter by radius, then sort by distance
+        within = np.flatnonzero(distances <= radius_km)
+        order = within[np.argsort(distances[within], kind='stable')]
         
-        return nearby_plants.to_dict('records') 
\ No newline at end of file
+        return plants.take(order).with_column('distance_km', distances[order]).to_records()
+    
+    @property
+    def service_area_grid(self):
+        """Lazily built nearest-plant raster over the configured cost surface"""
+        if self._service_area_grid is None:
+            self._flight.do('service_area_grid', self._build_service_area_grid)
+        return self._service_area_grid
+    
+    def _build_service_area_grid(self):
+        if self._service_area_grid is not None:
+            return
+        plants = self.data_service.treatment_plants_table
+        lats = plants.float64_column('latitude').tolist()
+        lngs = plants.float64_column('longitude').tolist()
+        grid = ServiceAreaGrid(
+            Config.SERVICE_AREA_BOUNDS,
+            Config.SERVICE_AREA_CELL_DEG,
+            self._load_cost_surface()
+        )
+        land = polygon_mask(land_rings(self.data_service), Config.SERVICE_AREA_BOUNDS, Config.SERVICE_AREA_CELL_DEG)
+        # A cell is land if its centre is; keep coastal plants whose cell centre is offshore
+        for lat, lng in zip(lats, lngs):
+            cell = grid.cell_of(lat, lng)
+            if cell is not None:
+                land[cell] = True
+        self._service_area_grid = grid.restrict(land).build(lats, lngs)
+    
+    def _load_cost_surface(self):
+        self.data_service.note_loaded(Config.SERVICE_AREA_COST_SURFACE)
+        return load_cost_surface(
+            Config.SERVICE_AREA_COST_SURFACE,
+            grid_shape(Config.SERVICE_AREA_BOUNDS, Config.SERVICE_AREA_CELL_DEG)
+        )
+    
+    def find_serving_plant(self, lat, lng):
+        """Plant whose service area contains the point, with the travel cost to it"""
+        serving = self.service_area_grid.serving(lat, lng)
+        if serving is None:
+            return None
+        plant_index, travel_km = serving
+        plants = self.data_service.treatment_plants_table
+        plant = plants.take([plant_index]).to_records()[0]
+        plant['travel_km'] = round(travel_km, 3)
+        return plant
+    
+    @cached('service_area_summary', SERVICE_AREA_SOURCES)
+    def get_service_area_summary(self):
+        """Cells, area and worst-case travel cost served by every plant"""
+        grid = self.service_area_grid
+        facility_ids = self.data_service.treatment_plants_table.column('facility_id').tolist()
+        return [
+            dict(facility_id=facility_id, **grid.plant_summary(i))
+            for i, facility_id in enumerate(facility_ids)
+        ]
+    
+    @cached('service_area', SERVICE_AREA_SOURCES)
+    def get_service_area(self, facility_id):
+        """Service area summary for one plant, or None if the plant is unknown"""
+        grid = self.service_area_grid
+        positions = np.flatnonzero(
+            self.data_service.treatment_plants_table.column('facility_id') == facility_id
+        )
+        if len(positions) == 0:
+            return None
+        return dict(facility_id=facility_id, **grid.plant_summary(int(positions[0])))
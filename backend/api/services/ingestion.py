@@ -0,0 +1,198 @@
+"""
+CSV Ingestion
+Chunked, schema-typed CSV loading with per-chunk validation.
+Rows that fail validation are dropped and reported; the load never aborts
+on bad data, only on a file that does not match its declared schema.
+"""
+import logging
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+INTEGER_LIMITS = {
+    'int16': np.iinfo(np.int16),
+    'int32': np.iinfo(np.int32),
+    'int64': np.iinfo(np.int64),
+}
+
+
+class IngestionReport:
+    """Row counts, timings and the first max_reported bad rows of one load"""
+
+    def __init__(self, path, max_reported=100):
+        self.path = path
+        self.max_reported = max_reported
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.bad_row_count = 0
+        self.bad_rows = []
+
+    def add_bad_rows(self, lines, column, reason, values):
+        self.bad_row_count += len(lines)
+        room = self.max_reported - len(self.bad_rows)
+        for line, value in list(zip(lines, values))[:max(room, 0)]:
+            self.bad_rows.append({'line': int(line), 'column': column, 'reason': reason, 'value': value})
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'rows_read': self.rows_read,
+            'rows_loaded': self.rows_loaded,
+            'bad_row_count': self.bad_row_count,
+            'bad_rows': self.bad_rows,
+            'chunks': self.chunks,
+            'seconds': round(self.seconds, 4),
+        }
+
+
+def _coerce_numeric(raw, dtype, column, bad, report, lines):
+    """Parse a string column as numbers, flagging unparsable, missing and out-of-range values"""
+    if pd.api.types.is_numeric_dtype(raw):
+        values = raw
+    else:
+        values = pd.to_numeric(raw, errors='coerce')
+        invalid = values.isna() & raw.notna()
+        _flag(invalid & ~bad, column, 'not a number', raw, report, lines, bad)
+
+    if dtype in INTEGER_LIMITS:
+        limits = INTEGER_LIMITS[dtype]
+        missing = values.isna() & ~bad
+        _flag(missing, column, 'missing value', raw, report, lines, bad)
+        fractional = values.notna() & (values != values.round()) & ~bad
+        _flag(fractional, column, 'not an integer', raw, report, lines, bad)
+        overflow = values.notna() & ((values < limits.min) | (values > limits.max)) & ~bad
+        _flag(overflow, column, f'out of {dtype} range', raw, report, lines, bad)
+    return values
+
+
+def _flag(mask, column, reason, raw, report, lines, bad):
+    mask = np.asarray(mask, dtype=bool)
+    if mask.any():
+        report.add_bad_rows(lines[mask], column, reason, raw[mask].tolist())
+        bad |= mask
+
+
+def _validate_chunk(chunk, schema, report, bounds, known_values):
+    """Typed copy of the chunk's valid rows and their line numbers; invalid rows go on the report"""
+    # Blank lines are read as empty rows so the index counts them: drop them
+    # only after taking the line numbers (1-based, after the header line)
+    lines = chunk.index.to_numpy() + 2
+    blank = chunk.isna().all(axis=1).to_numpy()
+    if blank.any():
+        chunk, lines = chunk[~blank], lines[~blank]
+    report.rows_read += len(chunk)
+    bad = np.zeros(len(chunk), dtype=bool)
+    parsed = {}
+
+    for column, dtype in schema.items():
+        raw = chunk[column]
+        if dtype in INTEGER_LIMITS or dtype.startswith('float'):
+            parsed[column] = _coerce_numeric(raw, dtype, column, bad, report, lines)
+        else:
+            parsed[column] = raw
+
+    # A bounded column must have a value: a plant without coordinates is as unusable as one outside them
+    for column, (low, high) in bounds.items():
+        values = parsed[column]
+        _flag(values.isna() & ~bad, column, 'missing value', chunk[column], report, lines, bad)
+        outside = values.notna() & ((values < low) | (values > high)) & ~bad
+        _flag(outside, column, f'outside [{low}, {high}]', chunk[column], report, lines, bad)
+
+    for column, allowed in known_values.items():
+        names = parsed[column].str.lower()
+        unknown = names.notna() & ~names.isin(allowed) & ~bad
+        _flag(unknown, column, 'unknown value', chunk[column], report, lines, bad)
+
+    good = ~bad
+    typed = {}
+    for column, dtype in schema.items():
+        values = parsed[column][good]
+        if dtype == 'category':
+            typed[column] = values.astype('category')
+        elif dtype == 'str':
+            typed[column] = values.astype(object)
+        else:
+            typed[column] = values.astype(dtype)
+    return pd.DataFrame(typed).reset_index(drop=True), lines[good]
+
+
+def _combine(frames, schema):
+    """Concatenate typed chunks, unioning categorical columns so they stay categorical"""
+    if not frames:
+        return pd.DataFrame({
+            column: pd.Series([], dtype=object if dtype == 'str' else dtype)
+            for column, dtype in schema.items()
+        })
+
+    columns = {}
+    for column, dtype in schema.items():
+        parts = [frame[column] for frame in frames]
+        if dtype == 'category':
+            columns[column] = pd.Series(union_categoricals(parts, sort_categories=True))
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def ingest_csv(path, schema, chunk_size=100000, unique=(), bounds=None,
+               known_values=None, max_reported=100):
+    """
+    Read a CSV in chunks and return (DataFrame, IngestionReport).
+
+    schema        ordered {column: dtype}; dtype is 'category', 'str', an
+                  int ('int16', 'int32', 'int64') or a float ('float32', 'float64')
+    unique        columns whose values must not repeat across the file
+    bounds        {column: (min, max)} inclusive numeric ranges; missing values
+                  in these columns are bad rows too
+    known_values  {column: set of allowed lower-cased strings}
+    """
+    report = IngestionReport(path, max_reported=max_reported)
+    bounds = bounds or {}
+    known_values = known_values or {}
+    frames = []
+    line_parts = []
+    start = time.perf_counter()
+
+    # Let the C parser type numeric columns itself; a chunk with bad values
+    # comes back as strings for that column and is coerced row by row
+    read_dtypes = {
+        column: ('category' if dtype == 'category' else str)
+        for column, dtype in schema.items()
+        if dtype in ('category', 'str')
+    }
+    reader = pd.read_csv(
+        path, dtype=read_dtypes, usecols=list(schema), chunksize=chunk_size, skip_blank_lines=False
+    )
+    with reader:
+        for chunk in reader:
+            report.chunks += 1
+            frame, lines = _validate_chunk(chunk, schema, report, bounds, known_values)
+            frames.append(frame)
+            line_parts.append(lines)
+
+    df = _combine(frames, schema)[list(schema)]
+
+    # Uniqueness spans chunks, so it is checked once on the combined table
+    if unique and len(df):
+        lines = np.concatenate(line_parts)
+        duplicate = np.zeros(len(df), dtype=bool)
+        for column in unique:
+            _flag(df[column].duplicated().to_numpy() & ~duplicate, column, 'duplicate id',
+                  df[column], report, lines, duplicate)
+        if duplicate.any():
+            df = df[~duplicate].reset_index(drop=True)
+
+    report.rows_loaded = len(df)
+    report.seconds = time.perf_counter() - start
+
+    if report.bad_row_count:
+        logger.warning(
+            '%s: dropped %d of %d rows that failed validation (first: %s)',
+            path, report.bad_row_count, report.rows_read, report.bad_rows[:3]
+        )
+    return df, report
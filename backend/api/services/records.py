@@ -0,0 +1,240 @@
+"""
+Columnar Records
+Compact in-memory tables: one NumPy array per column, low-cardinality
+string columns stored as integer codes into a tuple of interned strings,
+free-text columns as NumPy variable-width strings (NumPy 2; object arrays
+of str before that).
+"""
+import json
+import sys
+from json.encoder import encode_basestring_ascii
+import numpy as np
+
+# NumPy 2 stores short strings inline and long ones in one per-array arena,
+# instead of an 8-byte pointer to a ~50+ byte str object per value
+_StringDType = getattr(getattr(np, 'dtypes', None), 'StringDType', None)
+# Strings up to this many bytes fit in a StringDType element
+_INLINE_STRING_BYTES = 15
+# Rows encoded per batch by to_json
+_JSON_BATCH_ROWS = 4096
+
+
+class ColumnarTable:
+    """
+    Immutable column store built once from a DataFrame.
+    Filtering returns a new table that shares the category tuples, and
+    to_records() / to_json() serialize straight from the arrays without going
+    through pandas or boxing NumPy scalars.
+    """
+
+    def __init__(self, columns, categories):
+        self._columns = columns
+        self._categories = categories
+        self._indexes = {}
+        self._widened = {}
+
+    @classmethod
+    def from_frame(cls, df, categorical=()):
+        columns = {}
+        categories = {}
+        for name in df.columns:
+            series = df[name]
+            if name in categorical:
+                cat = series.astype('category').cat
+                categories[name] = tuple(sys.intern(str(value)) for value in cat.categories)
+                columns[name] = cat.codes.to_numpy(dtype=np.int32)
+            elif _is_text(series):
+                values = series.to_numpy(dtype=object, na_value=None)
+                columns[name] = values.astype(_StringDType(na_object=None)) if _StringDType else values
+            else:
+                columns[name] = series.to_numpy()
+        return cls(columns, categories)
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+
+    @property
+    def column_names(self):
+        return list(self._columns)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the column arrays and category strings"""
+        total = 0
+        for name, values in self._columns.items():
+            total += values.nbytes
+            if values.dtype == object:
+                total += sum(sys.getsizeof(v) for v in values)
+            elif values.dtype.kind == 'T':
+                # Arena bytes of the strings too long to be stored inline
+                total += sum(
+                    len(v.encode()) + 8 for v in values.tolist()
+                    if v is not None and len(v) > _INLINE_STRING_BYTES
+                )
+        for labels in self._categories.values():
+            total += sum(sys.getsizeof(label) for label in labels)
+        return total
+
+    def column(self, name):
+        """Decoded column as a NumPy array"""
+        values = self._columns[name]
+        if name not in self._categories:
+            return values
+        labels = np.array(self._categories[name] + (None,), dtype=object)
+        return labels[values]
+
+    def float64_column(self, name):
+        """
+        Numeric column widened to float64. float32 values go through their
+        shortest repr so a stored 37.6017 comes back as 37.6017, not 37.60169982910156.
+        """
+        widened = self._widened.get(name)
+        if widened is None:
+            values = self._columns[name]
+            if values.dtype == np.float32:
+                widened = values.astype(str).astype(np.float64)
+            else:
+                widened = values.astype(np.float64)
+            self._widened[name] = widened
+        return widened
+
+    def equals_ignore_case(self, name, value):
+        """Boolean mask of rows whose column matches value case-insensitively"""
+        target = value.lower()
+        values = self._columns[name]
+        if name in self._categories:
+            codes = [i for i, label in enumerate(self._categories[name]) if label.lower() == target]
+            return np.isin(values, codes)
+        return np.fromiter(
+            (isinstance(v, str) and v.lower() == target for v in values),
+            dtype=bool, count=len(values)
+        )
+
+    def take(self, selector):
+        """New table restricted to a boolean mask or integer index array"""
+        return ColumnarTable(
+            {name: values[selector] for name, values in self._columns.items()},
+            self._categories
+        )
+
+    def with_column(self, name, values):
+        """New table with an extra (or replaced) plain column"""
+        columns = dict(self._columns)
+        columns[name] = np.asarray(values)
+        return ColumnarTable(columns, self._categories)
+
+    def find(self, name, value):
+        """Row view for the first row where column == value, using a lazily built hash index"""
+        index = self._indexes.get(name)
+        if index is None:
+            index = {}
+            for position, key in enumerate(self._columns[name].tolist()):
+                index.setdefault(key, position)
+            self._indexes[name] = index
+        position = index.get(value)
+        return None if position is None else RecordView(self, position)
+
+    def _python_column(self, name):
+        values = self._columns[name]
+        if name in self._categories:
+            labels = self._categories[name]
+            return [labels[code] if code >= 0 else None for code in values.tolist()]
+        if values.dtype == np.float32:
+            return self.float64_column(name).tolist()
+        return values.tolist()
+
+    def to_frame(self):
+        """DataFrame with the same columns; categorical columns become pandas categoricals"""
+        import pandas as pd
+        columns = {}
+        for name, values in self._columns.items():
+            if name in self._categories:
+                columns[name] = pd.Categorical.from_codes(values, self._categories[name])
+            elif values.dtype.kind == 'T':
+                columns[name] = pd.Series(values.astype(object), dtype=object, copy=False)
+            else:
+                # Keep object columns as object rather than letting pandas infer a string dtype
+                columns[name] = pd.Series(values, dtype=values.dtype, copy=False)
+        return pd.DataFrame(columns)
+
+    def to_records(self):
+        """List of plain dicts with native Python values, ready for jsonify"""
+        names = list(self._columns)
+        columns = [self._python_column(name) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+    def _json_column(self, name):
+        """JSON text of every value of a column, as a list of str"""
+        values = self._columns[name]
+        if name in self._categories:
+            encoded = [encode_basestring_ascii(label) for label in self._categories[name]] + ['null']
+            return np.array(encoded, dtype=object)[values].tolist()
+        if values.dtype.kind == 'f':
+            encoded = np.array(list(map(float.__repr__, self.float64_column(name).tolist())), dtype=object)
+            encoded[np.isnan(values)] = 'NaN'
+            encoded[np.isposinf(values)] = 'Infinity'
+            encoded[np.isneginf(values)] = '-Infinity'
+            return encoded.tolist()
+        if values.dtype.kind in 'iu':
+            return list(map(int.__repr__, values.tolist()))
+        if values.dtype.kind == 'b':
+            return ['true' if value else 'false' for value in values.tolist()]
+        return [
+            encode_basestring_ascii(value) if isinstance(value, str) else json.dumps(value)
+            for value in self._python_column(name)
+        ]
+
+    def to_json(self, sort_keys=False):
+        """
+        JSON array of the rows as objects, the same text as compact
+        json.dumps(to_records(), sort_keys=...), written column by column
+        without building row dicts
+        """
+        if not len(self):
+            return '[]'
+        names = sorted(self._columns) if sort_keys else list(self._columns)
+        fields = ','.join(json.dumps(name).replace('%', '%%') + ':%s' for name in names)
+        row = '{' + fields + '}'
+        # Encode a batch of rows at a time so the per-value strings stay short-lived
+        batches = []
+        for start in range(0, len(self), _JSON_BATCH_ROWS):
+            batch = self.take(slice(start, start + _JSON_BATCH_ROWS))
+            columns = [batch._json_column(name) for name in names]
+            batches.append(','.join(map(row.__mod__, zip(*columns))))
+        return '[' + ','.join(batches) + ']'
+
+    def value(self, name, position):
+        raw = self._columns[name][position]
+        if name in self._categories:
+            return self._categories[name][raw] if raw >= 0 else None
+        if isinstance(raw, np.float32):
+            return float(str(raw))
+        return raw.item() if isinstance(raw, np.generic) else raw
+
+
+def _is_text(series):
+    """True for a column of str values (missing values allowed)"""
+    import pandas as pd
+    return pd.api.types.infer_dtype(series, skipna=True) == 'string'
+
+
+class RecordView:
+    """Lightweight read-only view of one table row"""
+    __slots__ = ('_table', '_position')
+
+    def __init__(self, table, position):
+        self._table = table
+        self._position = position
+
+    def __getitem__(self, name):
+        return self._table.value(name, self._position)
+
+    def keys(self):
+        return self._table.column_names
+
+    def to_dict(self):
+        return {name: self[name] for name in self.keys()}
+
+    def __repr__(self):
+        return f"RecordView({self.to_dict()!r})"
+
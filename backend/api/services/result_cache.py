@@ -0,0 +1,367 @@
+"""
+Result Cache
+Two-level cache for service results shared across instances (Config.CACHE_*):
+an in-process LRU (local tier) in front of a Redis-protocol server (shared
+tier), so a freshly started instance reuses what the others computed.
+
+Keys embed the version of the source data the service has loaded, so a data
+update moves to new keys instead of invalidating old ones. Shared values are
+JSON compressed with zlib; the local tier is bounded by the JSON size of its
+entries, and results above CACHE_MAX_ITEM_BYTES are not cached. A miss is
+computed once per process (single flight) and, through a short SET NX lock
+in the shared tier, once across instances; the others poll for the value.
+The shared tier is best effort: if it fails, the result is computed locally,
+and if it cannot be set up at all the cache runs with the local tier only.
+
+Cached results are handed to every caller, so treat them as read-only.
+"""
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from config import Config
+from api.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheUnavailable(Exception):
+    """Raised when the configured shared backend cannot be used"""
+
+
+class MemoryBackend:
+    """In-process stand-in for the shared tier with Redis GET/SET EX NX semantics, for tests"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _live(self, key, now):
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None, nx=False):
+        with self._lock:
+            now = time.monotonic()
+            if nx and self._live(key, now) is not None:
+                return False
+            self._values[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete_if_equal(self, key, value):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            if entry is not None and entry[0] == value:
+                del self._values[key]
+                return True
+            return False
+
+
+class RedisBackend:
+    """Shared tier on any Redis-protocol server (Redis, Memorystore, Valkey, ...)"""
+
+    name = 'redis'
+
+    # Release a lock only if it still holds our token
+    _DELETE_IF_EQUAL = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise CacheUnavailable('CACHE_BACKEND=redis requires the redis package')
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=Config.CACHE_REDIS_TIMEOUT_S,
+            socket_connect_timeout=Config.CACHE_REDIS_TIMEOUT_S
+        )
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl=None, nx=False):
+        return bool(self._client.set(key, value, ex=ttl, nx=nx))
+
+    def delete_if_equal(self, key, value):
+        return bool(self._client.eval(self._DELETE_IF_EQUAL, 1, key, value))
+
+
+class TierStats:
+    """Hit, miss, error and latency counters for one cache tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, hit, seconds):
+        with self._lock:
+            if hit is None:
+                self.errors += 1
+            elif hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def metrics(self):
+        with self._lock:
+            calls = self.hits + self.misses + self.errors
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / calls, 4) if calls else None,
+                'avg_ms': round(self.seconds / calls * 1000, 3) if calls else None,
+                'max_ms': round(self.max_seconds * 1000, 3),
+            }
+
+
+class LocalLRU:
+    """LRU bounded by the total size of its entries (the length of their JSON encoding)"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def serialize(value):
+    """JSON bytes of a result, or None if it is not JSON serializable"""
+    try:
+        return json.dumps(value, separators=(',', ':')).encode()
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultCache:
+    def __init__(self, shared=None, max_bytes=None, namespace=None):
+        self.local = LocalLRU(max_bytes or Config.CACHE_LOCAL_MAX_BYTES)
+        self.shared = shared
+        self.namespace = namespace or Config.CACHE_NAMESPACE
+        self._flight = SingleFlight()
+        self.stats = {'local': TierStats(), 'shared': TierStats(), 'compute': TierStats()}
+        self.lock_waits = 0
+        self.uncacheable = 0
+        # Why the configured shared tier is not in use, if it could not be set up
+        self.shared_error = None
+
+    def key(self, name, version, parts):
+        digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+        return f'{self.namespace}:{name}:{version}:{digest}'
+
+    def get_or_compute(self, key, compute):
+        start = time.perf_counter()
+        value = self.local.get(key)
+        self.stats['local'].record(value is not _MISSING, time.perf_counter() - start)
+        if value is not _MISSING:
+            return value
+        return self._flight.do(key, self._fill, key, compute)
+
+    def _fill(self, key, compute):
+        value = self.local.get(key)
+        if value is not _MISSING:
+            return value
+        if self.shared is None:
+            return self._compute_and_store(key, compute, publish=False)
+        value = self._shared_get(key)
+        if value is not _MISSING:
+            return value
+        return self._compute_shared(key, compute)
+
+    def _shared_call(self, fn, *args, **kwargs):
+        """Run a shared-tier operation; errors are counted and returned as (None, False)"""
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.stats['shared'].record(None, time.perf_counter() - start)
+            return None, False
+        return result, time.perf_counter() - start
+
+    def _shared_get(self, key):
+        """Value from the shared tier (also stored locally), or _MISSING on a miss, error or bad blob"""
+        blob, elapsed = self._shared_call(self.shared.get, key)
+        if elapsed is False:
+            return _MISSING
+        if blob is None:
+            self.stats['shared'].record(False, elapsed)
+            return _MISSING
+        try:
+            payload = zlib.decompress(blob)
+            value = json.loads(payload)
+        except Exception:
+            self.stats['shared'].record(None, elapsed)
+            return _MISSING
+        self.stats['shared'].record(True, elapsed)
+        self.local.set(key, value, len(payload))
+        return value
+
+    def _compute_and_store(self, key, compute, publish):
+        """Compute a value and cache it, unless it is too large or not JSON serializable"""
+        start = time.perf_counter()
+        value = compute()
+        self.stats['compute'].record(False, time.perf_counter() - start)
+
+        payload = serialize(value)
+        if payload is None or len(payload) > Config.CACHE_MAX_ITEM_BYTES:
+            self.uncacheable += 1
+            return value
+        self.local.set(key, value, len(payload))
+        if publish:
+            self._shared_call(
+                self.shared.set, key, zlib.compress(payload, Config.CACHE_COMPRESS_LEVEL),
+                ttl=Config.CACHE_TTL_S
+            )
+        return value
+
+    def _compute_shared(self, key, compute):
+        """Compute under a cross-instance lock, or wait for the instance holding it"""
+        lock_key, token = key + ':lock', uuid.uuid4().hex
+        acquired, _ = self._shared_call(
+            self.shared.set, lock_key, token, ttl=Config.CACHE_LOCK_TTL_S, nx=True
+        )
+        if acquired is False:
+            self.lock_waits += 1
+            value = self._wait_for(key)
+            if value is not _MISSING:
+                return value
+
+        try:
+            return self._compute_and_store(key, compute, publish=True)
+        finally:
+            if acquired:
+                self._shared_call(self.shared.delete_if_equal, lock_key, token)
+
+    def _wait_for(self, key):
+        """Poll the shared tier for a value another instance is computing"""
+        deadline = time.monotonic() + Config.CACHE_LOCK_WAIT_S
+        delay = 0.02
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            value = self._shared_get(key)
+            if value is not _MISSING:
+                return value
+        return _MISSING
+
+    def metrics(self):
+        metrics = {name: self.stats[name].metrics() for name in ('local', 'shared')}
+        metrics['local']['entries'] = len(self.local)
+        metrics['local']['bytes'] = self.local.bytes
+        compute = self.stats['compute'].metrics()
+        metrics['compute'] = {'count': compute['misses'], 'avg_ms': compute['avg_ms'], 'max_ms': compute['max_ms']}
+        metrics['backend'] = self.shared.name if self.shared is not None else 'local'
+        metrics['lock_waits'] = self.lock_waits
+        metrics['uncacheable'] = self.uncacheable
+        if self.shared_error:
+            metrics['shared_error'] = self.shared_error
+        return metrics
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _shared_backend(name):
+    """Shared tier for a CACHE_BACKEND name; raises CacheUnavailable if it cannot be used"""
+    factories = {
+        'local': lambda: None,
+        'memory': MemoryBackend,
+        'redis': lambda: RedisBackend(Config.CACHE_REDIS_URL),
+    }
+    if name not in factories:
+        raise CacheUnavailable(f'unknown CACHE_BACKEND {name!r}')
+    return factories[name]()
+
+
+def get_result_cache():
+    """
+    Process-wide cache for Config.CACHE_BACKEND, or None when caching is off.
+    A backend that cannot be set up (e.g. redis without the redis package) is
+    logged once and the cache runs with its local tier only.
+    """
+    global _cache
+    if Config.CACHE_BACKEND == 'off':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    cache = ResultCache(_shared_backend(Config.CACHE_BACKEND))
+                except CacheUnavailable as e:
+                    logger.error('result cache: %s; using the local tier only', e)
+                    cache = ResultCache(None)
+                    cache.shared_error = str(e)
+                _cache = cache
+    return _cache
+
+
+def cached(name, sources):
+    """
+    Cache a service method's result, keyed by its arguments and the version
+    of the source data it is computed from: sources are Config attribute names,
+    versioned as loaded in memory (DataService.loaded_version), so a file
+    changed on disk without a reload does not publish old data under a new key.
+    Methods of other services use their data_service attribute.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = get_result_cache()
+            if cache is None:
+                return method(self, *args, **kwargs)
+            version = getattr(self, 'data_service', self).loaded_version(sources)
+            key = cache.key(name, version, [args, sorted(kwargs.items())])
+            return cache.get_or_compute(key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def cache_metrics():
+    cache = get_result_cache()
+    return cache.metrics() if cache is not None else {'backend': 'off'}
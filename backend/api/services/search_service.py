@@ -0,0 +1,346 @@
+"""
+Search Service
+Typeahead search over county names, facility names and cities.
+Every name, word suffix and acronym is a key in one sorted byte array, so
+a prefix query is a binary search for a range of keys ranked by integer
+ranks; the ranges of short, very common prefixes are ranked once at build
+time. A trigram index in flat arrays backs typo-tolerant matching. Both are
+built once, so a query never scans the full tables.
+"""
+import re
+import numpy as np
+from config import Config
+from api.services.data_service import data_service
+from api.services.single_flight import SingleFlight
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Lower rank sorts first
+KIND_RANK = {'county': 0, 'city': 1, 'facility': 2}
+MATCH_RANK = {'exact': 0, 'prefix': 1, 'word_prefix': 2, 'acronym': 3, 'fuzzy': 4}
+KINDS = sorted(KIND_RANK, key=KIND_RANK.get)
+MATCHES = sorted(MATCH_RANK, key=MATCH_RANK.get)
+
+# Keys are stored as their first KEY_BYTES bytes; longer queries are checked
+# against the full key
+KEY_BYTES = 32
+# Key ranges up to this size are ranked per query, larger ones at build time
+RANK_SCAN_LIMIT = 4096
+
+# Normalized text is ' ', a-z and 0-9; a trigram is a base-37 code
+_ALPHABET = b' abcdefghijklmnopqrstuvwxyz0123456789'
+_CHAR_CODE = np.zeros(256, dtype=np.int32)
+_CHAR_CODE[np.frombuffer(_ALPHABET, dtype=np.uint8)] = np.arange(len(_ALPHABET))
+_GRAM_CODES = len(_ALPHABET) ** 3
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(' ', str(text).lower()).strip()
+
+
+def acronym(name):
+    """First letters of a normalized name's words, or None for a single word"""
+    words = name.split()
+    return ''.join(word[0] for word in words) if len(words) > 1 else None
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _gram_code(gram):
+    a, b, c = _CHAR_CODE[np.frombuffer(gram.encode(), dtype=np.uint8)]
+    return int(a) * 1369 + int(b) * 37 + int(c)
+
+
+def _next_prefix(prefix):
+    """Smallest byte string greater than every string starting with prefix"""
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+class SearchIndex:
+    """
+    Immutable prefix and trigram index over search entries, held as flat
+    arrays: entry i is labels[i] of type kinds[i] in counties[i], with
+    facility_ids[i] (-1 for counties and cities).
+    """
+
+    def __init__(self, labels, kinds, counties, facility_ids, node_capacity):
+        self.labels = labels
+        self._kinds = np.array([KIND_RANK[kind] for kind in kinds], dtype=np.int8)
+        self._counties = counties
+        self._facility_ids = np.asarray(facility_ids, dtype=np.int64)
+        self._node_capacity = node_capacity
+        normalized = [normalize(label) for label in labels]
+
+        # Rank of an entry among hits of the same match type: kind, label length, label
+        order = sorted(range(len(labels)), key=lambda i: (self._kinds[i], len(labels[i]), labels[i]))
+        self._entry_rank = np.empty(len(labels), dtype=np.int64)
+        self._entry_rank[order] = np.arange(len(labels))
+
+        self._build_keys(normalized)
+        self._build_trigrams(normalized)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _build_keys(self, normalized):
+        """Sorted key array: each name, the suffix at every word start and the acronym"""
+        keys, entries, offsets, matches = [], [], [], []
+        word_prefix, prefix, by_acronym = MATCH_RANK['word_prefix'], MATCH_RANK['prefix'], MATCH_RANK['acronym']
+        for entry_id, name in enumerate(normalized):
+            keys.append(name)
+            entries.append(entry_id)
+            offsets.append(0)
+            matches.append(prefix)
+            start = name.find(' ')
+            while start != -1:
+                keys.append(name[start + 1:])
+                entries.append(entry_id)
+                offsets.append(start + 1)
+                matches.append(word_prefix)
+                start = name.find(' ', start + 1)
+            short = acronym(name)
+            if short:
+                keys.append(short)
+                entries.append(entry_id)
+                offsets.append(-1)
+                matches.append(by_acronym)
+
+        keys = np.array([key.encode() for key in keys], dtype=f'S{KEY_BYTES}')
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._key_entries = np.array(entries, dtype=np.int32)[order]
+        self._key_offsets = np.array(offsets, dtype=np.int16)[order]
+        self._key_matches = np.array(matches, dtype=np.int8)[order]
+        self._ranked = self._rank_large_ranges()
+
+    def _build_trigrams(self, normalized):
+        """Postings per trigram code (entry ids, ascending) in one array, CSR style"""
+        padded = [f'  {name} '.encode() for name in normalized]
+        lengths = np.array([len(text) for text in padded], dtype=np.int64)
+        chars = _CHAR_CODE[np.frombuffer(b''.join(padded), dtype=np.uint8)]
+        codes = chars[:-2] * 1369 + chars[1:-1] * 37 + chars[2:]
+        owners = np.repeat(np.arange(len(padded), dtype=np.int64), lengths)[:-2]
+        # Drop the trigrams that straddle two names
+        ends = np.cumsum(lengths)
+        valid = np.ones(len(codes), dtype=bool)
+        for shift in (1, 2):
+            straddle = ends - shift
+            valid[straddle[straddle < len(codes)]] = False
+
+        pairs = np.unique(owners[valid] * _GRAM_CODES + codes[valid])
+        pair_entries = (pairs // _GRAM_CODES).astype(np.int32)
+        pair_codes = pairs % _GRAM_CODES
+        self._gram_counts = np.bincount(pair_entries, minlength=len(normalized)).astype(np.int16)
+        order = np.argsort(pair_codes, kind='stable')
+        self._postings = pair_entries[order]
+        self._gram_offsets = np.zeros(_GRAM_CODES + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_codes, minlength=_GRAM_CODES), out=self._gram_offsets[1:])
+
+    def _range(self, prefix):
+        """[lo, hi) positions of the keys starting with prefix (bytes, at most KEY_BYTES)"""
+        lo = int(np.searchsorted(self._keys, prefix, 'left'))
+        hi = int(np.searchsorted(self._keys, _next_prefix(prefix), 'left')) if prefix else len(self._keys)
+        return lo, hi
+
+    def _best(self, lo, hi, kind=None):
+        """Key positions of the best node_capacity distinct entries in [lo, hi), in rank order"""
+        positions = np.arange(lo, hi)
+        entries = self._key_entries[lo:hi]
+        if kind is not None:
+            keep = self._kinds[entries] == kind
+            positions, entries = positions[keep], entries[keep]
+        ranks = self._key_matches[positions].astype(np.int64) * len(self) + self._entry_rank[entries]
+
+        # An entry has a few keys, so a few times node_capacity candidates leave enough distinct ones
+        wanted = self._node_capacity * 4
+        if len(ranks) > wanted:
+            top = np.argpartition(ranks, wanted)[:wanted]
+            positions, entries, ranks = positions[top], entries[top], ranks[top]
+        order = np.argsort(ranks, kind='stable')
+        _, first = np.unique(entries[order], return_index=True)
+        return positions[order[np.sort(first)]][:self._node_capacity]
+
+    def _rank_large_ranges(self):
+        """Best hits, overall and per type, of every prefix with more than RANK_SCAN_LIMIT keys"""
+        ranked = {}
+        stack = [b'']
+        while stack:
+            prefix = stack.pop()
+            lo, hi = self._range(prefix)
+            if hi - lo <= RANK_SCAN_LIMIT:
+                continue
+            if prefix:
+                ranked[prefix] = {kind: self._best(lo, hi, kind) for kind in (None,) + tuple(range(len(KINDS)))}
+            if len(prefix) == KEY_BYTES:
+                continue
+            # Keys equal to the prefix sort first; then one child range per next byte
+            position = int(np.searchsorted(self._keys, prefix, 'right')) if prefix else lo
+            while position < hi:
+                child = bytes(self._keys[position][:len(prefix) + 1])
+                stack.append(child)
+                position = self._range(child)[1]
+        return ranked
+
+    def _full_key(self, position):
+        name = normalize(self.labels[self._key_entries[position]])
+        offset = int(self._key_offsets[position])
+        return acronym(name) if offset < 0 else name[offset:]
+
+    def _prefix_hits(self, query, kind=None):
+        """(entry id, match) of the best entries with a key starting with query, in rank order"""
+        prefix = query.encode()[:KEY_BYTES]
+        kind_code = KIND_RANK[kind] if kind else None
+        lo, hi = self._range(prefix)
+        if lo == hi:
+            return []
+        if len(query) > KEY_BYTES:
+            # Truncated keys only narrow the range; compare the rest of the key
+            matching = [p for p in range(lo, hi) if self._full_key(p).startswith(query)]
+            positions = np.array(matching, dtype=np.int64)
+            if kind_code is not None:
+                positions = positions[self._kinds[self._key_entries[positions]] == kind_code]
+            best = positions[np.argsort(
+                self._key_matches[positions].astype(np.int64) * len(self)
+                + self._entry_rank[self._key_entries[positions]], kind='stable'
+            )] if len(positions) else positions
+            _, first = np.unique(self._key_entries[best], return_index=True)
+            best = best[np.sort(first)][:self._node_capacity]
+        elif prefix in self._ranked:
+            best = self._ranked[prefix][kind_code]
+        else:
+            best = self._best(lo, hi, kind_code)
+        return [
+            (entry_id, MATCHES[match])
+            for entry_id, match in zip(self._key_entries[best].tolist(), self._key_matches[best].tolist())
+        ]
+
+    def _postings_of(self, code):
+        return self._postings[self._gram_offsets[code]:self._gram_offsets[code + 1]]
+
+    def _fuzzy_hits(self, query, exclude):
+        """
+        Entries whose trigram (Dice) similarity to query reaches the threshold.
+        Candidates come from the query trigrams found in at most
+        SEARCH_FUZZY_MAX_POSTINGS entries; trigrams more common than that
+        ('ter', ' sa') would touch most of the index, so they are only looked
+        up (binary search) for those candidates. A query made only of common
+        trigrams has no typo matches.
+        """
+        codes = [_gram_code(gram) for gram in trigrams(query)]
+        rare, common = [], []
+        for code in codes:
+            postings = self._postings_of(code)
+            if len(postings) == 0:
+                continue
+            (rare if len(postings) <= Config.SEARCH_FUZZY_MAX_POSTINGS else common).append(postings)
+        if not rare:
+            return []
+
+        candidates, shared = np.unique(np.concatenate(rare), return_counts=True)
+        for postings in common:
+            found = np.searchsorted(postings, candidates)
+            shared += postings[np.minimum(found, len(postings) - 1)] == candidates
+
+        similarity = 2.0 * shared / (len(codes) + self._gram_counts[candidates])
+        keep = similarity >= Config.SEARCH_FUZZY_THRESHOLD
+        if exclude:
+            keep &= ~np.isin(candidates, list(exclude))
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.lexsort((candidates, -similarity))
+        return list(zip(candidates[order].tolist(), similarity[order].tolist()))
+
+    def entry(self, entry_id):
+        """Search result fields of one entry"""
+        kind = KINDS[self._kinds[entry_id]]
+        result = {'type': kind, 'label': self.labels[entry_id]}
+        if kind == 'facility':
+            result['facility_id'] = int(self._facility_ids[entry_id])
+        result['county'] = self._counties[entry_id]
+        return result
+
+    def search(self, query, limit=10, kind=None):
+        query = normalize(query)
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(entry_id, match, score):
+            if entry_id in seen or (kind and self._kinds[entry_id] != KIND_RANK[kind]):
+                return
+            seen.add(entry_id)
+            results.append(dict(self.entry(entry_id), match=match, score=round(score, 3)))
+
+        prefix_hits = self._prefix_hits(query, kind)
+        names = {entry_id: normalize(self.labels[entry_id]) for entry_id, _ in prefix_hits}
+        for entry_id, match in prefix_hits:
+            if names[entry_id] == query:
+                add(entry_id, 'exact', 1.0)
+        for entry_id, match in prefix_hits:
+            if acronym(names[entry_id]) == query:
+                add(entry_id, 'acronym', 0.95)
+        for entry_id, match in prefix_hits:
+            add(entry_id, match, 1.0 - 0.1 * MATCH_RANK[match])
+
+        if len(results) < limit and len(query) >= 3:
+            for entry_id, similarity in self._fuzzy_hits(query, seen):
+                add(entry_id, 'fuzzy', 0.6 * similarity)
+                if len(results) >= limit:
+                    break
+
+        return results[:limit]
+
+
+def collect_entries(county_names, plants):
+    """Entry columns (labels, kinds, counties, facility ids): counties, then each plant and its city"""
+    labels, kinds, counties, facility_ids = [], [], [], []
+
+    def add(kind, label, county, facility_id=-1):
+        labels.append(label)
+        kinds.append(kind)
+        counties.append(county)
+        facility_ids.append(facility_id)
+
+    for county_name in county_names:
+        add('county', str(county_name), str(county_name))
+
+    seen_cities = set()
+    for name, facility_id, county, city in zip(
+        plants.column('facility_name').tolist(), plants.column('facility_id').tolist(),
+        plants.column('county').tolist(), plants.column('city').tolist()
+    ):
+        add('facility', name, county, facility_id)
+        if city and (city, county) not in seen_cities:
+            seen_cities.add((city, county))
+            add('city', city, county)
+    return labels, kinds, counties, facility_ids
+
+
+class SearchService:
+    def __init__(self):
+        self.data_service = data_service
+        self._index = None
+        self._flight = SingleFlight()
+
+    @property
+    def index(self):
+        """Lazily built search index"""
+        if self._index is None:
+            self._flight.do('index', self._build_if_missing)
+        return self._index
+
+    def _build_if_missing(self):
+        if self._index is None:
+            self._index = SearchIndex(*self._collect_entries(), Config.SEARCH_NODE_CAPACITY)
+
+    def _collect_entries(self):
+        county_names = self.data_service.population_data['county_name'].dropna().unique()
+        return collect_entries(county_names, self.data_service.treatment_plants_table)
+
+    def search(self, query, limit=10, kind=None):
+        """Ranked prefix, acronym and typo-tolerant matches for query"""
+        return self.index.search(query, limit=limit, kind=kind)
@@ -0,0 +1,213 @@
+"""
+Service Area Service
+Offline grid approximation of travel-distance service areas.
+The state is rasterized into lat/lng cells and a multi-source Dijkstra over
+a cost surface assigns every cell to the plant with the cheapest path, so
+"which plant serves this point" is a single array lookup. Cells outside the
+land mask (the county boundaries) are impassable, so ocean and neighbouring
+states are never served.
+"""
+import heapq
+import logging
+import os
+from math import cos, isfinite, radians, sqrt
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.32
+
+# 8-connected neighbourhood: (row offset, col offset)
+NEIGHBOURS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+class ServiceAreaGrid:
+    """
+    Nearest-plant raster. owner[r, c] is the plant index serving the cell
+    (-1 if unreachable) and travel_km[r, c] the cost-weighted distance to it.
+    """
+
+    def __init__(self, bounds, cell_deg, cost_surface=None):
+        self.lat_min, self.lat_max, self.lng_min, self.lng_max = bounds
+        self.cell_deg = cell_deg
+        self.rows, self.cols = grid_shape(bounds, cell_deg)
+
+        if cost_surface is None:
+            cost_surface = np.ones((self.rows, self.cols), dtype=np.float32)
+        elif cost_surface.shape != (self.rows, self.cols):
+            raise ValueError(
+                f'cost surface shape {cost_surface.shape} does not match grid {(self.rows, self.cols)}'
+            )
+        # Non-positive or NaN cost marks a cell as impassable
+        cost = np.asarray(cost_surface, dtype=np.float32)
+        self.cost = np.where(np.isfinite(cost) & (cost > 0), cost, np.inf).astype(np.float32)
+
+        self.owner = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        self.travel_km = np.full((self.rows, self.cols), np.inf, dtype=np.float32)
+        self.plant_count = 0
+
+        # Cell dimensions shrink with latitude in the east-west direction
+        centre_lats = self.lat_min + (np.arange(self.rows) + 0.5) * cell_deg
+        self._dy_km = cell_deg * KM_PER_DEGREE
+        self._dx_km = [cell_deg * KM_PER_DEGREE * cos(radians(lat)) for lat in centre_lats]
+        self.cell_area_km2 = (np.array(self._dx_km) * self._dy_km).astype(np.float32)
+
+    def restrict(self, mask):
+        """Make every cell outside a boolean (rows x cols) mask impassable; call before build"""
+        self.cost = np.where(mask, self.cost, np.inf).astype(np.float32)
+        return self
+
+    def cell_of(self, lat, lng):
+        """(row, col) of the cell containing a point, or None outside the grid or for NaN/inf coordinates"""
+        if not (isfinite(lat) and isfinite(lng)):
+            return None
+        row = int((lat - self.lat_min) // self.cell_deg)
+        col = int((lng - self.lng_min) // self.cell_deg)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row, col
+        return None
+
+    def _step_km(self, row, d_row, d_col):
+        dx = self._dx_km[row] * abs(d_col)
+        dy = self._dy_km * abs(d_row)
+        return sqrt(dx * dx + dy * dy)
+
+    def build(self, lats, lngs):
+        """Multi-source Dijkstra from every plant cell over the cost surface"""
+        rows, cols = self.rows, self.cols
+        cost = self.cost.tolist()
+        travel = [[float('inf')] * cols for _ in range(rows)]
+        owner = [[-1] * cols for _ in range(rows)]
+        heap = []
+
+        self.plant_count = len(lats)
+        for plant, (lat, lng) in enumerate(zip(lats, lngs)):
+            # Plants without usable coordinates (or outside the grid) serve no cells
+            cell = self.cell_of(lat, lng)
+            if cell is None or cost[cell[0]][cell[1]] == float('inf'):
+                continue
+            row, col = cell
+            if travel[row][col] > 0:
+                travel[row][col] = 0.0
+                owner[row][col] = plant
+                heapq.heappush(heap, (0.0, row, col, plant))
+
+        while heap:
+            dist, row, col, plant = heapq.heappop(heap)
+            if dist > travel[row][col] or owner[row][col] != plant:
+                continue
+            here = cost[row][col]
+            for d_row, d_col in NEIGHBOURS:
+                r, c = row + d_row, col + d_col
+                if not (0 <= r < rows and 0 <= c < cols):
+                    continue
+                there = cost[r][c]
+                if there == float('inf'):
+                    continue
+                candidate = dist + self._step_km(row, d_row, d_col) * (here + there) / 2
+                if candidate < travel[r][c]:
+                    travel[r][c] = candidate
+                    owner[r][c] = plant
+                    heapq.heappush(heap, (candidate, r, c, plant))
+
+        self.owner = np.array(owner, dtype=np.int32)
+        self.travel_km = np.array(travel, dtype=np.float32)
+        self._summarize()
+        return self
+
+    def serving(self, lat, lng):
+        """(plant index, travel km) for the cell containing a point, or None"""
+        cell = self.cell_of(lat, lng)
+        if cell is None or self.owner[cell] < 0:
+            return None
+        return int(self.owner[cell]), float(self.travel_km[cell])
+
+    def _summarize(self):
+        """Per-plant reductions over the owner raster, computed once after build"""
+        served = self.owner >= 0
+        owners = self.owner[served]
+        areas = np.broadcast_to(self.cell_area_km2[:, None], self.owner.shape)[served]
+
+        self.cells_served = np.bincount(owners, minlength=self.plant_count)
+        self.area_km2_served = np.bincount(owners, weights=areas, minlength=self.plant_count)
+        self.max_travel_km = np.zeros(self.plant_count, dtype=np.float32)
+        np.maximum.at(self.max_travel_km, owners, self.travel_km[served])
+
+    def plant_summary(self, plant):
+        return {
+            'cells': int(self.cells_served[plant]),
+            'area_km2': round(float(self.area_km2_served[plant]), 1),
+            'max_travel_km': round(float(self.max_travel_km[plant]), 3),
+        }
+
+
+def grid_shape(bounds, cell_deg):
+    """(rows, cols) of the grid ServiceAreaGrid builds for these bounds and cell size"""
+    lat_min, lat_max, lng_min, lng_max = bounds
+    return int(np.ceil((lat_max - lat_min) / cell_deg)), int(np.ceil((lng_max - lng_min) / cell_deg))
+
+
+def load_cost_surface(path, shape):
+    """
+    Optional cost surface (.npy, rows x cols multipliers); None means uniform
+    cost. A surface built for another grid (bounds or SERVICE_AREA_CELL_DEG
+    changed since) is logged and ignored rather than failing every request.
+    """
+    if not (path and os.path.exists(path)):
+        return None
+    surface = np.load(path)
+    if surface.shape != tuple(shape):
+        logger.error(
+            'service areas: cost surface %s is %s but the grid is %s; rebuild it with '
+            'build_cost_surface.py. Using uniform cost.', path, surface.shape, tuple(shape)
+        )
+        return None
+    return surface
+
+
+def boundary_rings(geojson):
+    """Polygon rings, as (n, 2) arrays of lng/lat, of every Polygon or MultiPolygon feature"""
+    rings = []
+    for feature in geojson.get('features', []):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+        for polygon in polygons:
+            for ring in polygon:
+                if len(ring) >= 3:
+                    rings.append(np.array([point[:2] for point in ring], dtype=np.float64))
+    return rings
+
+
+def polygon_mask(rings, bounds, cell_deg):
+    """
+    Cells whose centre lies inside the rings (even-odd rule, so holes and
+    several non-overlapping polygons work), by scanning each cell row
+    """
+    lat_min, _, lng_min, _ = bounds
+    rows, cols = grid_shape(bounds, cell_deg)
+    # Toggle counts per cell; a crossing flips every cell centre east of it
+    toggles = np.zeros((rows, cols + 1), dtype=np.int32)
+    for ring in rings:
+        x0, y0 = ring[:, 0], ring[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        # Row-centre coordinates, in cells, between each edge's endpoints (half-open)
+        r0 = (np.minimum(y0, y1) - lat_min) / cell_deg - 0.5
+        r1 = (np.maximum(y0, y1) - lat_min) / cell_deg - 0.5
+        first = np.clip(np.ceil(r0), 0, rows).astype(np.int64)
+        last = np.clip(np.ceil(r1), 0, rows).astype(np.int64)
+        counts = last - first
+        if not counts.sum():
+            continue
+        edge = np.repeat(np.arange(len(x0)), counts)
+        row = first[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        lat = lat_min + (row + 0.5) * cell_deg
+        t = (lat - y0[edge]) / (y1[edge] - y0[edge])
+        lng = x0[edge] + t * (x1[edge] - x0[edge])
+        col = np.clip(np.ceil((lng - lng_min) / cell_deg - 0.5), 0, cols).astype(np.int64)
+        np.add.at(toggles, (row, col), 1)
+    return (np.cumsum(toggles, axis=1)[:, :cols] % 2).astype(bool)
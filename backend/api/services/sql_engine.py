@@ -0,0 +1,240 @@
+"""
+SQL Engine
+Embedded, in-process copy of the population, water quality and treatment
+plant tables for ad-hoc and service queries (Config.SQL_ENGINE).
+
+'sqlite' uses the standard library: one shared-cache in-memory database,
+a connection per thread with a prepared-statement cache, and an authorizer
+that only allows reads. 'duckdb' uses the optional duckdb package, a
+columnar engine with vectorized joins and aggregates, opened without
+external (file, network, extension) access and with its settings locked.
+
+Queries are single statements with bound parameters, capped at a time
+limit; anything other than a read is rejected.
+"""
+import threading
+import time
+import uuid
+import sqlite3
+from config import Config
+
+# (table, column) pairs to index; text lookups go through lower(column)
+INDEXES = [
+    ('population', 'county_name'),
+    ('water_quality', 'county_name'),
+    ('treatment_plants', 'facility_id'),
+    ('treatment_plants', 'county'),
+]
+
+
+class EngineUnavailable(Exception):
+    """Raised when the SQL engine is switched off or its library is not installed"""
+
+
+class QueryError(Exception):
+    """Invalid, non read-only or failing query"""
+
+
+class QueryTimeout(QueryError):
+    """Query ran past its time limit"""
+
+
+def _sql_type(dtype):
+    if dtype.kind in 'iub':
+        return 'BIGINT'
+    if dtype.kind == 'f':
+        return 'DOUBLE'
+    return 'TEXT'
+
+
+def _column_values(series):
+    """Python values of a column with missing values as None"""
+    missing = series.isna().to_numpy()
+    if series.dtype == 'float32':
+        # Widen through the shortest repr (37.6017, not 37.60169982)
+        series = series.astype(str).astype('float64')
+    values = series.astype(object).tolist()
+    if missing.any():
+        values = [None if m else v for v, m in zip(values, missing)]
+    return values
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SqlEngine:
+    """Common loading and result handling; subclasses provide the backend"""
+
+    name = None
+
+    def __init__(self, tables):
+        self.tables = {}
+        for table, df in tables.items():
+            columns = [str(c) for c in df.columns]
+            self.tables[table] = columns
+            self._create_table(
+                table,
+                [(c, _sql_type(df[c].dtype)) for c in columns],
+                [_column_values(df[c]) for c in columns]
+            )
+        for table, column in INDEXES:
+            if column in self.tables.get(table, ()):
+                self._create_index(table, column)
+
+    def query(self, sql, params=None, max_rows=None, timeout=None):
+        """Run one read-only statement. Returns (columns, rows, truncated)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        return self._execute(sql, params if params is not None else (), max_rows, deadline)
+
+    def records(self, sql, params=None):
+        """Rows of a service query as a list of dicts"""
+        columns, rows, _ = self.query(sql, params)
+        return [dict(zip(columns, row)) for row in rows]
+
+    @staticmethod
+    def _fetch(cursor, max_rows):
+        columns = [d[0] for d in cursor.description or ()]
+        if max_rows is None:
+            return columns, cursor.fetchall(), False
+        rows = cursor.fetchmany(max_rows + 1)
+        return columns, rows[:max_rows], len(rows) > max_rows
+
+
+class SqliteEngine(SqlEngine):
+    name = 'sqlite'
+
+    # Authorizer actions a read-only query needs; everything else is denied
+    ALLOWED_ACTIONS = {
+        sqlite3.SQLITE_SELECT,
+        sqlite3.SQLITE_READ,
+        sqlite3.SQLITE_FUNCTION,
+        getattr(sqlite3, 'SQLITE_RECURSIVE', 33),
+    }
+
+    def __init__(self, tables):
+        self._uri = f'file:engine-{uuid.uuid4().hex}?mode=memory&cache=shared'
+        self._local = threading.local()
+        # The in-memory database lives as long as this connection stays open
+        self._owner = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        super().__init__(tables)
+        self._owner.commit()
+
+    def _create_table(self, table, columns, values):
+        definition = ', '.join(f'{_quote(c)} {t}' for c, t in columns)
+        placeholders = ', '.join('?' * len(columns))
+        self._owner.execute(f'CREATE TABLE {_quote(table)} ({definition})')
+        self._owner.executemany(f'INSERT INTO {_quote(table)} VALUES ({placeholders})', zip(*values))
+
+    def _create_index(self, table, column):
+        self._owner.execute(
+            f'CREATE INDEX {_quote(f"ix_{table}_{column}")} ON {_quote(table)} ({_quote(column)})'
+        )
+        self._owner.execute(
+            f'CREATE INDEX {_quote(f"ix_{table}_{column}_lower")} ON {_quote(table)} (lower({_quote(column)}))'
+        )
+
+    def _authorize(self, action, *args):
+        return sqlite3.SQLITE_OK if action in self.ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._uri, uri=True, cached_statements=Config.SQL_STATEMENT_CACHE_SIZE
+            )
+            connection.execute('PRAGMA query_only = ON')
+            connection.set_authorizer(self._authorize)
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql, params, max_rows, deadline):
+        connection = self._connection()
+        if deadline is not None:
+            connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        try:
+            cursor = connection.execute(sql, params)
+            return self._fetch(cursor, max_rows)
+        except sqlite3.OperationalError as e:
+            if str(e) == 'interrupted':
+                raise QueryTimeout('Query exceeded its time limit')
+            raise QueryError(str(e))
+        except (sqlite3.DatabaseError, sqlite3.ProgrammingError) as e:
+            raise QueryError(str(e))
+        finally:
+            connection.set_progress_handler(None, 0)
+
+
+class DuckDbEngine(SqlEngine):
+    name = 'duckdb'
+
+    def __init__(self, tables):
+        try:
+            import duckdb
+        except ImportError:
+            raise EngineUnavailable('SQL_ENGINE=duckdb requires the duckdb package')
+        self._duckdb = duckdb
+        # No file, network or extension access (read_csv, glob, httpfs, ATTACH, COPY)
+        self._owner = duckdb.connect(':memory:', config={'enable_external_access': False})
+        self._local = threading.local()
+        super().__init__(tables)
+        # Queries must not see Python variables or turn the settings back on
+        self._owner.execute('SET python_enable_replacements = false')
+        self._owner.execute('SET lock_configuration = true')
+
+    def _create_table(self, table, columns, values):
+        import pandas as pd
+        frame = pd.DataFrame({c: v for (c, _), v in zip(columns, values)})
+        definition = ', '.join(f'{_quote(c)} {t}' for c, t in columns)
+        self._owner.execute(f'CREATE TABLE {_quote(table)} ({definition})')
+        self._owner.register('_load_frame', frame)
+        self._owner.execute(f'INSERT INTO {_quote(table)} SELECT * FROM _load_frame')
+        self._owner.unregister('_load_frame')
+
+    def _create_index(self, table, column):
+        self._owner.execute(
+            f'CREATE INDEX {_quote(f"ix_{table}_{column}")} ON {_quote(table)} ({_quote(column)})'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._owner.cursor()
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql, params, max_rows, deadline):
+        connection = self._connection()
+        try:
+            statements = connection.extract_statements(sql)
+        except self._duckdb.Error as e:
+            raise QueryError(str(e))
+        if len(statements) != 1:
+            raise QueryError('Exactly one statement is allowed')
+        if statements[0].type != self._duckdb.StatementType.SELECT:
+            raise QueryError('Only SELECT statements are allowed')
+
+        timer = None
+        if deadline is not None:
+            timer = threading.Timer(max(deadline - time.monotonic(), 0), connection.interrupt)
+            timer.start()
+        try:
+            connection.execute(sql, params)
+            return self._fetch(connection, max_rows)
+        except self._duckdb.InterruptException:
+            raise QueryTimeout('Query exceeded its time limit')
+        except self._duckdb.Error as e:
+            raise QueryError(str(e))
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+
+ENGINES = {'sqlite': SqliteEngine, 'duckdb': DuckDbEngine}
+
+
+def create_engine(name, tables):
+    """Engine for Config.SQL_ENGINE loaded with tables ({name: DataFrame})"""
+    if name not in ENGINES:
+        raise EngineUnavailable(f'SQL engine is disabled (SQL_ENGINE={name})')
+    return ENGINES[name](tables)
@@ -0,0 +1,177 @@
+"""
+Topology
+Converts polygon GeoJSON into TopoJSON: coordinates are quantized onto an
+integer grid, rings are cut at junctions into arcs, and an arc shared by
+two neighbouring polygons is stored once and referenced from both
+(reversed arcs are referenced as ~index).
+"""
+
+
+def _quantizer(features, quantization):
+    """Transform mapping lng/lat onto a quantization x quantization integer grid"""
+    xs, ys = [], []
+    for polygon in _polygons(features):
+        for ring in polygon:
+            for x, y in (point[:2] for point in ring):
+                xs.append(x)
+                ys.append(y)
+    if not xs:
+        return [1, 1], [0, 0]
+    x0, y0 = min(xs), min(ys)
+    kx = (max(xs) - x0) / (quantization - 1) or 1
+    ky = (max(ys) - y0) / (quantization - 1) or 1
+    return [kx, ky], [x0, y0]
+
+
+def _polygons(features):
+    for feature in features:
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            yield geometry['coordinates']
+        elif geometry.get('type') == 'MultiPolygon':
+            yield from geometry['coordinates']
+
+
+def _quantize_ring(ring, scale, translate):
+    """Quantized ring as a cycle of points (closing point dropped, repeats removed)"""
+    kx, ky = scale
+    x0, y0 = translate
+    points = []
+    for point in ring:
+        q = (int(round((point[0] - x0) / kx)), int(round((point[1] - y0) / ky)))
+        if not points or points[-1] != q:
+            points.append(q)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def _canonical_cycle(points):
+    """Rotation of a junction-free ring starting at its smallest point"""
+    start = points.index(min(points))
+    return points[start:] + points[:start]
+
+
+class Topology:
+    """Arcs and per-feature arc references built once from a GeoJSON FeatureCollection"""
+
+    def __init__(self, geojson, quantization=100000):
+        features = geojson.get('features', [])
+        self.scale, self.translate = _quantizer(features, quantization)
+        self.features = features
+        self.arcs = []
+        self._arc_index = {}
+        self._encoded_arcs = None
+
+        rings_by_feature = []
+        for feature in features:
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                polygons = None
+            rings_by_feature.append(
+                None if polygons is None else [
+                    [_quantize_ring(ring, self.scale, self.translate) for ring in polygon]
+                    for polygon in polygons
+                ]
+            )
+
+        junctions = self._find_junctions(
+            ring
+            for polygons in rings_by_feature if polygons
+            for polygon in polygons
+            for ring in polygon
+        )
+
+        self.geometries = []
+        for feature, polygons in zip(features, rings_by_feature):
+            if polygons is None:
+                self.geometries.append({'type': None})
+                continue
+            arcs = [
+                [self._ring_arcs(ring, junctions) for ring in polygon if len(ring) >= 3]
+                for polygon in polygons
+            ]
+            if feature['geometry']['type'] == 'Polygon':
+                self.geometries.append({'type': 'Polygon', 'arcs': arcs[0]})
+            else:
+                self.geometries.append({'type': 'MultiPolygon', 'arcs': arcs})
+
+    @staticmethod
+    def _find_junctions(rings):
+        """Points where rings meet with different neighbours, i.e. where shared borders start or end"""
+        neighbours = {}
+        junctions = set()
+        for ring in rings:
+            count = len(ring)
+            for i, point in enumerate(ring):
+                pair = frozenset((ring[i - 1], ring[(i + 1) % count]))
+                seen = neighbours.setdefault(point, pair)
+                if seen != pair:
+                    junctions.add(point)
+        return junctions
+
+    def _add_arc(self, points):
+        """Index of an arc, reusing an existing arc (or its reverse) when already stored"""
+        key = tuple(points)
+        index = self._arc_index.get(key)
+        if index is not None:
+            return index
+        reverse = self._arc_index.get(key[::-1])
+        if reverse is not None:
+            return ~reverse
+        self._arc_index[key] = len(self.arcs)
+        self.arcs.append(points)
+        return len(self.arcs) - 1
+
+    def _ring_arcs(self, ring, junctions):
+        cuts = [i for i, point in enumerate(ring) if point in junctions]
+        if not cuts:
+            # Closed ring with no junctions; match it against its reversed form too
+            forward = _canonical_cycle(ring)
+            backward = _canonical_cycle(ring[::-1])
+            if tuple(backward + backward[:1]) in self._arc_index:
+                return [~self._arc_index[tuple(backward + backward[:1])]]
+            return [self._add_arc(forward + forward[:1])]
+
+        start = cuts[0]
+        rotated = ring[start:] + ring[:start]
+        offsets = [i - start for i in cuts] + [len(ring)]
+        rotated.append(rotated[0])
+        return [
+            self._add_arc(rotated[begin:end + 1])
+            for begin, end in zip(offsets, offsets[1:])
+        ]
+
+    def delta_encoded_arcs(self):
+        """Arcs with the first point absolute and every later point relative to the previous one"""
+        if self._encoded_arcs is not None:
+            return self._encoded_arcs
+        encoded = []
+        for arc in self.arcs:
+            previous_x, previous_y = 0, 0
+            deltas = []
+            for x, y in arc:
+                deltas.append([x - previous_x, y - previous_y])
+                previous_x, previous_y = x, y
+            encoded.append(deltas)
+        self._encoded_arcs = encoded
+        return encoded
+
+    def to_topojson(self, properties, object_name='counties'):
+        """TopoJSON document; properties is one dict per feature, in feature order"""
+        geometries = [
+            dict(geometry, properties=props)
+            for geometry, props in zip(self.geometries, properties)
+        ]
+        return {
+            'type': 'Topology',
+            'transform': {'scale': self.scale, 'translate': self.translate},
+            'objects': {
+                object_name: {'type': 'GeometryCollection', 'geometries': geometries}
+            },
+            'arcs': self.delta_encoded_arcs(),
+        }
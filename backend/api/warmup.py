@@ -0,0 +1,74 @@
+"""
+Warmup
+Runs after the app is created: imports pandas, loads every dataset, builds
+the search index, service-area grid and topology, and renders each warmup
+route once so the JSON serializers are primed. /ready reports when it is done,
+and stays unready if a required (not WARMUP_OPTIONAL_ROUTES) route failed.
+"""
+import logging
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    def __init__(self, mode):
+        self.mode = mode
+        self.started_at = None
+        self.finished_at = None
+        self.steps = []
+        self.failed_routes = []
+        self._done = threading.Event()
+        if mode == 'off':
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and not self.failed_routes
+
+    def start(self, app):
+        """Warm up synchronously ('blocking') or on a daemon thread ('background')"""
+        if self.mode == 'blocking':
+            self.run(app)
+        elif self.mode == 'background':
+            threading.Thread(target=self.run, args=(app,), name='warmup', daemon=True).start()
+
+    def run(self, app):
+        self.started_at = time.time()
+        client = app.test_client()
+        try:
+            for route in Config.WARMUP_ROUTES:
+                step_start = time.perf_counter()
+                try:
+                    status = client.get(route).status_code
+                except Exception as e:
+                    status = f'error: {e}'
+                self.steps.append({
+                    'route': route,
+                    'status': status,
+                    'ms': round((time.perf_counter() - step_start) * 1000, 1)
+                })
+                # An optional route that fails (e.g. missing GeoJSON) just stays lazy
+                ok = isinstance(status, int) and 200 <= status < 300
+                if not ok and route not in Config.WARMUP_OPTIONAL_ROUTES:
+                    self.failed_routes.append(route)
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+            if self.failed_routes:
+                logger.error('warmup failed for %s', ', '.join(self.failed_routes))
+            logger.info('warmup finished in %.2fs', self.finished_at - self.started_at)
+
+    def status(self):
+        return {
+            'status': 'failed' if self.failed_routes else ('ready' if self.ready else 'warming'),
+            'mode': self.mode,
+            'warmup_seconds': (
+                round(self.finished_at - self.started_at, 3)
+                if self.started_at and self.finished_at else None
+            ),
+            'failed_routes': self.failed_routes,
+            'steps': self.steps,
+        }
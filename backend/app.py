@@ -5,7 +5,11 @@ Main application entry point
 import os
 from flask import Flask, jsonify
 from flask_cors import CORS
+from config import Config
 from api.routes import register_routes
+from api.warmup import Warmup
+from api.admission import AdmissionController
+from api.services.result_cache import cache_metrics
 
 def create_app():
     app = Flask(__name__)
@@ -34,9 +38,35 @@ def create_app():
     def api_health():
         return jsonify({"status": "healthy", "api": "v1"})
     
+    # Readiness: 503 until warmup (see Config.STARTUP_MODE) has finished
+    warmup = Warmup(Config.STARTUP_MODE)
+    app.extensions['warmup'] = warmup
+    
+    @app.route('/ready')
+    def ready():
+        return jsonify(warmup.status()), (200 if warmup.ready else 503)
+    
+    # Per cost class concurrency limits and load shedding (see Config.ADMISSION_*)
+    admission = AdmissionController()
+    if Config.ADMISSION_ENABLED:
+        admission.init_app(app)
+    
+    @app.route('/metrics')
+    def metrics():
+        return jsonify({
+            'admission': {'enabled': Config.ADMISSION_ENABLED, 'classes': admission.metrics()},
+            'cache': cache_metrics()
+        })
+    
     # Register API routes
     register_routes(app)
     
+    # CLI: flask --app app export-static
+    from static_export import export_static_command
+    app.cli.add_command(export_static_command)
+    
+    warmup.start(app)
+    
     return app
 
 if __name__ == '__main__':
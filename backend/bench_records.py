@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DataFrame records vs ColumnarTable for treatment plant lookups
+Measures resident table size and per-request allocations on a synthetic dataset,
+and (--worker) the resident memory of a whole worker that loads the plants
+CSV through DataService and serves a list, a lookup and a CSV export.
+
+Usage:
+    python bench_records.py [ROWS]              (default 1,000,000)
+    python bench_records.py --worker [ROWS]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from api.services.records import ColumnarTable
+
+
+def synthetic_plants(rows):
+    rng = np.random.default_rng(0)
+    counties = np.array([f'County {i}' for i in range(58)], dtype=object)
+    cities = np.array([f'City {i}' for i in range(2000)], dtype=object)
+    ids = np.arange(1000, 1000 + rows)
+    return pd.DataFrame({
+        'facility_id': ids,
+        'facility_name': [f'Plant {i}' for i in ids],
+        'address': [f'{i} Main St' for i in ids],
+        'city': cities[rng.integers(0, len(cities), rows)],
+        'zip': rng.integers(90000, 96200, rows),
+        'county': counties[rng.integers(0, len(counties), rows)],
+        'latitude': rng.uniform(32.5, 42.0, rows),
+        'longitude': rng.uniform(-124.4, -114.1, rows),
+        'contact_number': [f'555-{i % 1000:03d}-{i % 10000:04d}' for i in ids],
+        'public_access': np.where(rng.random(rows) < 0.5, 'Yes', 'No').astype(object),
+    })
+
+
+def measure(label, fn):
+    """Run fn once under tracemalloc; report time, peak bytes and live blocks of the result"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:8.1f} MB  blocks {blocks:>10,}")
+    return result
+
+
+def rss_mb():
+    """Current resident set size of this process (Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+def worker(rows):
+    """Write a plants CSV with real county names, then load and serve it in a fresh interpreter"""
+    counties = pd.read_csv(Config.POPULATION_DATA)['county_name'].to_numpy(dtype=object)
+    df = synthetic_plants(rows)
+    df['county'] = counties[np.arange(rows) % len(counties)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'plants.csv')
+        df.to_csv(path, index=False)
+        del df
+        probe = (
+            'import bench_records as b\n'
+            'from config import Config\n'
+            f'Config.TREATMENT_PLANTS_DATA = {path!r}\n'
+            'from api.services.data_service import data_service\n'
+            'from api.services.export_service import ExportService\n'
+            'start = b.rss_mb()\n'
+            'data_service.treatment_plants_table\n'
+            'loaded = b.rss_mb()\n'
+            'data_service.get_treatment_plants(county_filter="Kern")\n'
+            'data_service.get_treatment_plant_by_id(1000)\n'
+            'for _ in ExportService().stream_csv("treatment-plants", {"county": "Kern"}): pass\n'
+            'print(f"  worker RSS: {start:.1f} MB after import, {loaded:.1f} MB after load, "\n'
+            '      f"{b.rss_mb():.1f} MB after list, lookup and CSV export")\n'
+        )
+        print(f"{rows:,} plants, whole worker")
+        subprocess.run([sys.executable, '-c', probe], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    if sys.argv[1:2] == ['--worker']:
+        worker(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+        return
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = synthetic_plants(rows)
+    table = ColumnarTable.from_frame(df, categorical=Config.TREATMENT_PLANTS_CATEGORICAL_COLUMNS)
+    county = 'county 7'
+    facility_id = 1000 + rows // 2
+
+    print(f"{rows:,} plants")
+    print(f"  DataFrame memory                 {df.memory_usage(deep=True).sum() / 1e6:9.1f} MB")
+    print(f"  ColumnarTable memory             {table.nbytes / 1e6:9.1f} MB")
+
+    print("Filter by county (baseline / columnar):")
+    measure('DataFrame.to_dict', lambda: df[df['county'].str.lower() == county].to_dict('records'))
+    measure('ColumnarTable.to_records', lambda: table.take(table.equals_ignore_case('county', county)).to_records())
+
+    print("Serialize all rows (records + json.dumps / column-wise):")
+    measure('json.dumps(to_records())', lambda: json.dumps(table.to_records(), separators=(',', ':')))
+    measure('ColumnarTable.to_json', table.to_json)
+
+    print("Lookup by facility_id (baseline / columnar):")
+    table.find('facility_id', facility_id)  # build the id index outside the timed call
+    measure('DataFrame row to_dict', lambda: df[df['facility_id'] == facility_id].iloc[0].to_dict())
+    measure('ColumnarTable.find', lambda: table.find('facility_id', facility_id))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: search index build and query latency
+Builds the /search index over the synthetic plants of bench_records.py
+(plus the real county list) and times prefix, acronym, typo and typed
+queries; build time and peak traced memory are reported like bench_records.
+
+Usage:
+    python bench_search.py [ROWS]    (default 100,000)
+"""
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from config import Config
+from api.services.records import ColumnarTable
+from api.services.search_service import SearchIndex, collect_entries
+from bench_records import measure, synthetic_plants
+
+QUERIES = [
+    ('prefix', 'pla', None),
+    ('prefix', 'plant 5', None),
+    ('word prefix', 'main', None),
+    ('acronym', 'cs', None),
+    ('exact', 'county 7', None),
+    ('typo', 'plnat 12345', None),
+    ('typo', 'cuonty 12', None),
+    ('no hits', 'qzxv plnt', None),
+    ('typed prefix', 'c', 'city'),
+    ('typed typo', 'ctiy 1999', 'city'),
+]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    plants = ColumnarTable.from_frame(
+        synthetic_plants(rows), categorical=Config.TREATMENT_PLANTS_CATEGORICAL_COLUMNS
+    )
+    county_names = pd.read_csv(Config.POPULATION_DATA)['county_name'].unique()
+    columns = collect_entries(county_names, plants)
+
+    print(f"{rows:,} plants, {len(columns[0]):,} search entries")
+    index = measure('SearchIndex build', lambda: SearchIndex(*columns, Config.SEARCH_NODE_CAPACITY))
+
+    print("Query latency (median of 20):")
+    for label, query, kind in QUERIES:
+        times = []
+        for _ in range(20):
+            start = time.perf_counter()
+            results = index.search(query, limit=10, kind=kind)
+            times.append(time.perf_counter() - start)
+        print(f"  {label:<13} {query!r:<16} {statistics.median(times) * 1000:8.3f} ms  {len(results)} hits")
+
+
+if __name__ == '__main__':
+    main()
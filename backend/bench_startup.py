@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start with and without warmup
+Each mode runs in a fresh interpreter and reports import + create_app time,
+time until /ready, and the latency of the first real requests.
+
+Usage:
+    python bench_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+client = flask_app.test_client()
+while client.get('/ready').status_code != 200:
+    time.sleep(0.01)
+ready = time.perf_counter()
+first = {}
+for route in ['/api/v1/counties', '/api/v1/search?q=san',
+              '/api/v1/treatment-plants/nearby?lat=34.05&lng=-118.24&radius=50']:
+    t = time.perf_counter()
+    client.get(route)
+    first[route] = round((time.perf_counter() - t) * 1000, 1)
+print(json.dumps({
+    'import_s': round(imported - start, 3),
+    'create_app_s': round(created - imported, 3),
+    'until_ready_s': round(ready - start, 3),
+    'first_request_ms': first,
+}))
+'''
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    for mode in ('off', 'background', 'blocking'):
+        env = dict(os.environ, STARTUP_MODE=mode)
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=here, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+        print(f"{mode:<11}", json.dumps(json.loads(output.strip().splitlines()[-1])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Service area cost surface
+Writes the .npy travel-cost surface read by the service-area grid, sized for
+the configured SERVICE_AREA_BOUNDS and SERVICE_AREA_CELL_DEG. Re-run it after
+changing either setting; a surface built for another grid is ignored.
+
+Cell values are travel-cost multipliers: 1.0 for ordinary terrain, larger
+for slower cells (mountains, no roads), NaN or <= 0 for impassable cells.
+This script writes 1.0 on land (inside the county boundaries, or the
+fallback outline without the GeoJSON) and NaN elsewhere; an optional
+multiplier raster of the same shape (.npy) is applied on top, e.g. one
+derived from slope or road density.
+
+Usage:
+    python build_cost_surface.py [OUTPUT] [--multipliers FILE.npy]
+"""
+import argparse
+
+import numpy as np
+
+from config import Config
+from api.services.data_service import data_service
+from api.services.geo_service import land_rings
+from api.services.service_area_service import grid_shape, polygon_mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', nargs='?', default=Config.SERVICE_AREA_COST_SURFACE)
+    parser.add_argument('--multipliers', help='.npy of per-cell multipliers for the same grid')
+    args = parser.parse_args()
+
+    shape = grid_shape(Config.SERVICE_AREA_BOUNDS, Config.SERVICE_AREA_CELL_DEG)
+    land = polygon_mask(land_rings(data_service), Config.SERVICE_AREA_BOUNDS, Config.SERVICE_AREA_CELL_DEG)
+    surface = np.where(land, 1.0, np.nan).astype(np.float32)
+    if args.multipliers:
+        multipliers = np.load(args.multipliers)
+        if multipliers.shape != shape:
+            raise SystemExit(f'multipliers are {multipliers.shape}, the grid is {shape}')
+        surface *= multipliers.astype(np.float32)
+
+    np.save(args.output, surface)
+    print(f"{args.output}: {shape[0]} x {shape[1]} cells of {Config.SERVICE_AREA_CELL_DEG} deg, "
+          f"{int(land.sum()):,} on land")
+
+
+if __name__ == '__main__':
+    main()
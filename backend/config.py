@@ -13,6 +13,198 @@ class Config:
     TREATMENT_PLANTS_DATA = os.path.join(DATA_DIR, 'water_treatment_plants.csv')
     COUNTIES_GEOJSON = os.path.join(DATA_DIR, 'California_Counties.geojson')
     
+    # Declared CSV schemas (column -> dtype), see api/services/ingestion.py.
+    # 'category' columns are stored as interned categories in memory.
+    POPULATION_SCHEMA = {
+        'county_name': 'category',
+        'total_population': 'int64',
+    }
+    WATER_QUALITY_SCHEMA = {
+        'county_name': 'category',
+        'lead_avg_ug_per_L': 'float64',
+        'arsenic_avg_ug_per_L': 'float64',
+        'nitrate_avg_mg_per_L': 'float64',
+        'data_year': 'int16',
+    }
+    TREATMENT_PLANTS_SCHEMA = {
+        'facility_id': 'int32',
+        'facility_name': 'str',
+        'address': 'str',
+        'city': 'category',
+        'zip': 'str',
+        'county': 'category',
+        'latitude': 'float32',
+        'longitude': 'float32',
+        'contact_number': 'str',
+        'public_access': 'category',
+    }
+    TREATMENT_PLANTS_CATEGORICAL_COLUMNS = tuple(
+        column for column, dtype in TREATMENT_PLANTS_SCHEMA.items() if dtype == 'category'
+    )
+    
+    # Ingestion: rows per chunk, coordinate bounds for validation, bad rows kept per report
+    CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', 100000))
+    CA_LATITUDE_BOUNDS = (32.5, 42.05)
+    CA_LONGITUDE_BOUNDS = (-124.5, -114.1)
+    INGESTION_MAX_REPORTED_ROWS = 100
+    
     # API Configuration
     API_VERSION = 'v1'
-    API_PREFIX = f'/api/{API_VERSION}' 
\ No newline at end of file
+    API_PREFIX = f'/api/{API_VERSION}'
+    
+    # Choropleth: GeoJSON properties tried in order for the county name,
+    # TopoJSON grid resolution, and number of quantile classes
+    COUNTY_NAME_PROPERTIES = ('NAME', 'name', 'COUNTY_NAME', 'CountyName', 'county_name')
+    TOPOJSON_QUANTIZATION = 100000
+    CHOROPLETH_CLASSES = 5
+    
+    # Service areas: grid extent (lat_min, lat_max, lng_min, lng_max), cell size in
+    # degrees, and an optional .npy travel-cost multiplier per cell (rows x cols,
+    # see build_cost_surface.py; ignored if built for another grid)
+    SERVICE_AREA_BOUNDS = CA_LATITUDE_BOUNDS + CA_LONGITUDE_BOUNDS
+    SERVICE_AREA_CELL_DEG = float(os.environ.get('SERVICE_AREA_CELL_DEG', 0.05))
+    SERVICE_AREA_COST_SURFACE = os.environ.get(
+        'SERVICE_AREA_COST_SURFACE', os.path.join(DATA_DIR, 'service_area_cost.npy')
+    )
+    # Land mask used when COUNTIES_GEOJSON is missing: a coarse state outline
+    # (lng, lat), good to a few km, that keeps the ocean, Nevada and Arizona out
+    SERVICE_AREA_FALLBACK_OUTLINE = (
+        (-124.21, 42.00), (-120.00, 42.00), (-120.00, 39.00), (-114.63, 35.00),
+        (-114.57, 34.83), (-114.13, 34.27), (-114.43, 34.08), (-114.54, 33.60),
+        (-114.50, 33.03), (-114.72, 32.72), (-117.12, 32.53), (-117.25, 32.70),
+        (-117.28, 33.00), (-117.60, 33.38), (-118.00, 33.65), (-118.42, 33.74),
+        (-118.50, 34.00), (-118.80, 34.02), (-119.22, 34.15), (-119.70, 34.40),
+        (-120.47, 34.45), (-120.64, 34.57), (-120.65, 34.90), (-120.88, 35.25),
+        (-121.30, 35.66), (-121.90, 36.30), (-121.98, 36.58), (-121.80, 36.85),
+        (-122.03, 36.95), (-122.40, 37.20), (-122.52, 37.78), (-123.02, 37.99),
+        (-123.73, 38.92), (-123.85, 39.40), (-123.83, 39.80), (-124.40, 40.44),
+        (-124.25, 40.80), (-124.10, 41.30), (-124.20, 41.75),
+    )
+    
+    # Search (/search): hits kept per trie node and entry type, fuzzy match cutoff,
+    # max entries of a trigram used to find fuzzy candidates (more common trigrams
+    # only add to their score), max results per query
+    SEARCH_NODE_CAPACITY = 50
+    SEARCH_FUZZY_THRESHOLD = 0.35
+    SEARCH_FUZZY_MAX_POSTINGS = int(os.environ.get('SEARCH_FUZZY_MAX_POSTINGS', 2000))
+    SEARCH_MAX_RESULTS = 25
+    
+    # Bulk export (/export): rows per CSV chunk / Parquet row group, where
+    # Parquet and FlatGeobuf files are cached between requests, and the cache
+    # limits (least recently used files are evicted past either one)
+    EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 50000))
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', os.path.join(BASE_DIR, '..', 'export_cache'))
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    EXPORT_CACHE_MAX_FILES = int(os.environ.get('EXPORT_CACHE_MAX_FILES', 200))
+    
+    # Static export output (see static_export.py)
+    STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR', os.path.join(BASE_DIR, '..', 'static_api'))
+    
+    # Nearby search: round search coordinates to this many decimals so
+    # concurrent near-identical queries coalesce (unset = exact coordinates)
+    NEARBY_COORD_DECIMALS = (
+        int(os.environ['NEARBY_COORD_DECIMALS']) if os.environ.get('NEARBY_COORD_DECIMALS') else None
+    )
+    
+    # Startup: 'off' loads data lazily on first use, 'background' warms up on a
+    # thread after boot, 'blocking' warms up inside create_app (e.g. gunicorn --preload).
+    # /ready returns 503 until warmup has finished.
+    STARTUP_MODE = os.environ.get('STARTUP_MODE', 'off')
+    WARMUP_ROUTES = [
+        f'{API_PREFIX}/counties',
+        f'{API_PREFIX}/counties/population',
+        f'{API_PREFIX}/water-quality',
+        f'{API_PREFIX}/water-quality/statistics',
+        f'{API_PREFIX}/treatment-plants',
+        f'{API_PREFIX}/treatment-plants/nearby?lat=37.7749&lng=-122.4194&radius=1',
+        f'{API_PREFIX}/treatment-plants/service-areas',
+        f'{API_PREFIX}/search?q=warmup',
+        f'{API_PREFIX}/counties/boundaries',
+        f'{API_PREFIX}/counties/choropleth',
+    ]
+    # Warmup routes allowed to fail (the county GeoJSON is an optional download);
+    # if any other warmup route does not answer 2xx, /ready stays 503
+    WARMUP_OPTIONAL_ROUTES = (
+        f'{API_PREFIX}/counties/boundaries',
+        f'{API_PREFIX}/counties/choropleth',
+    )
+    
+    # Admission control (see api/admission.py), off unless ADMISSION_ENABLED=true:
+    # concurrency, queue length, deadline and Retry-After per cost class.
+    # A queued request holds a worker thread (gunicorn --threads WORKER_THREADS),
+    # so moderate + expensive concurrency + queue is kept to the thread count
+    # minus ADMISSION_RESERVED_THREADS; those threads are left for cheap lookups
+    # and health checks however many heavy requests arrive. Cheap requests are
+    # not queued: they run on any free thread.
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'false').lower() == 'true'
+    WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 8))
+    ADMISSION_RESERVED_THREADS = int(
+        os.environ.get('ADMISSION_RESERVED_THREADS', max(2, WORKER_THREADS // 3))
+    )
+    # Threads moderate and expensive requests may hold, split 2:1; each class
+    # runs half of its share (rounded up) and queues the rest
+    _HEAVY_THREADS = max(WORKER_THREADS - ADMISSION_RESERVED_THREADS, 2)
+    _EXPENSIVE_THREADS = max(1, _HEAVY_THREADS // 3)
+    _MODERATE_THREADS = _HEAVY_THREADS - _EXPENSIVE_THREADS
+    ADMISSION_CLASSES = {
+        'cheap': {'concurrency': WORKER_THREADS, 'queue': 0, 'deadline_s': 2.0, 'retry_after_s': 1},
+        'moderate': {
+            'concurrency': (_MODERATE_THREADS + 1) // 2, 'queue': _MODERATE_THREADS // 2,
+            'deadline_s': 10.0, 'retry_after_s': 2,
+        },
+        'expensive': {
+            'concurrency': (_EXPENSIVE_THREADS + 1) // 2, 'queue': _EXPENSIVE_THREADS // 2,
+            'deadline_s': 30.0, 'retry_after_s': 5,
+        },
+    }
+    ADMISSION_DEFAULT_CLASS = 'moderate'
+    ADMISSION_ENDPOINT_CLASSES = {
+        'counties.get_all_counties': 'cheap',
+        'counties.get_population_data': 'cheap',
+        'counties.get_county': 'cheap',
+        'water_quality.get_all_water_quality': 'cheap',
+        'water_quality.get_county_water_quality': 'cheap',
+        'water_quality.get_water_quality_statistics': 'cheap',
+        'water_quality.get_worst_counties': 'cheap',
+        'treatment_plants.get_all_treatment_plants': 'cheap',
+        'treatment_plants.get_treatment_plant': 'cheap',
+        'treatment_plants.get_treatment_plants_by_county': 'cheap',
+        'treatment_plants.get_serving_treatment_plant': 'cheap',
+        'treatment_plants.get_service_areas': 'cheap',
+        'treatment_plants.get_service_area': 'cheap',
+        'search.search': 'cheap',
+        'counties.get_county_boundaries': 'expensive',
+        'counties.get_county_choropleth': 'expensive',
+        'export.export_dataset': 'expensive',
+        'query.run_query': 'expensive',
+    }
+    # endpoint -> [(query arg, threshold, class)]: escalate when the arg exceeds the threshold
+    ADMISSION_ESCALATIONS = {
+        'treatment_plants.get_nearby_treatment_plants': [('radius', 100, 'expensive')],
+    }
+    ADMISSION_EXEMPT_ENDPOINTS = ('root', 'health', 'api_health', 'ready', 'metrics', 'static')
+    
+    # Embedded SQL (see api/services/sql_engine.py): 'off', 'sqlite' or 'duckdb'.
+    # When enabled, DataService county/water quality queries run on the engine
+    # and /query accepts read-only SQL with a time limit and row cap.
+    SQL_ENGINE = os.environ.get('SQL_ENGINE', 'off')
+    SQL_STATEMENT_CACHE_SIZE = 256
+    SQL_QUERY_TIMEOUT_S = float(os.environ.get('SQL_QUERY_TIMEOUT_S', 2.0))
+    SQL_MAX_ROWS = int(os.environ.get('SQL_MAX_ROWS', 10000))
+    
+    # Result cache (see api/services/result_cache.py): 'off', 'local' (in-process LRU only),
+    # 'memory' (LRU plus an in-process fake of the shared tier, for tests) or 'redis'
+    # (LRU plus any Redis-protocol server at CACHE_REDIS_URL; needs the redis package)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'off')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_REDIS_TIMEOUT_S = 0.5
+    CACHE_NAMESPACE = 'cawq'
+    # Local tier budget and largest cached result, both as JSON-encoded bytes
+    CACHE_LOCAL_MAX_BYTES = int(os.environ.get('CACHE_LOCAL_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_MAX_ITEM_BYTES = int(os.environ.get('CACHE_MAX_ITEM_BYTES', 4 * 1024 * 1024))
+    CACHE_TTL_S = int(os.environ.get('CACHE_TTL_S', 24 * 3600))
+    CACHE_COMPRESS_LEVEL = 6
+    # Stampede protection: how long a computing instance holds the shared lock,
+    # and how long other instances wait for its result before computing themselves
+    CACHE_LOCK_TTL_S = 30
+    CACHE_LOCK_WAIT_S = 10.0
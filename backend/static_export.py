@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Static API export
+Pre-renders every route whose output depends only on the data/ directory
+into a tree of JSON files that a static server or CDN can serve directly.
+
+Each route is written as <path>.json plus a gzip-compressed <path>.json.gz,
+e.g. /api/v1/counties/Alameda -> api/v1/counties/Alameda.json(.gz).
+A manifest.json records the source data hash of every output so that
+re-running the export only regenerates routes whose inputs changed.
+
+Usage:
+    flask --app app export-static [OUTPUT_DIR] [--force]
+    python static_export.py [OUTPUT_DIR] [--force]
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from urllib.parse import unquote
+
+import click
+from flask import url_for
+
+from config import Config
+from api.services.data_service import (
+    data_service as shared_data_service, COUNTY_SOURCES, WATER_QUALITY_SOURCES, TREATMENT_PLANTS_SOURCES
+)
+from api.services.choropleth_service import CHOROPLETH_SOURCES
+from api.services.geo_service import SERVICE_AREA_SOURCES
+
+MANIFEST_NAME = 'manifest.json'
+
+# Data files each route prefix depends on (first match wins). Water quality
+# and plant rows are validated against the population county list.
+# Per-plant service areas (/treatment-plants/<id>/service-area) are matched
+# by suffix in _route_sources.
+ROUTE_SOURCES = [
+    ('/counties/boundaries', ['COUNTIES_GEOJSON']),
+    ('/counties/choropleth', CHOROPLETH_SOURCES),
+    ('/counties/population', ['POPULATION_DATA']),
+    ('/counties', COUNTY_SOURCES),
+    ('/water-quality', WATER_QUALITY_SOURCES),
+    ('/treatment-plants/service-areas', SERVICE_AREA_SOURCES),
+    ('/treatment-plants', TREATMENT_PLANTS_SOURCES),
+]
+ALL_SOURCES = ['POPULATION_DATA', 'WATER_QUALITY_DATA', 'TREATMENT_PLANTS_DATA', 'COUNTIES_GEOJSON']
+
+# Liveness checks must always hit the running app; /query needs a sql argument
+EXCLUDED_ENDPOINTS = {'api_health', 'query.run_query'}
+
+
+def _entity_arguments(data_service):
+    """Argument sets for every per-entity route, keyed by endpoint"""
+    county_names = [c['county_name'] for c in data_service.get_all_counties()]
+    plants = data_service.treatment_plants_table
+    return {
+        'counties.get_county': [
+            {'county_name': name} for name in county_names
+        ],
+        'water_quality.get_county_water_quality': [
+            {'county_name': name} for name in data_service.water_quality_data['county_name']
+        ],
+        'treatment_plants.get_treatment_plant': [
+            {'facility_id': fid} for fid in plants.column('facility_id').tolist()
+        ],
+        'treatment_plants.get_treatment_plants_by_county': [
+            {'county_name': name} for name in dict.fromkeys(plants.column('county')) if name is not None
+        ],
+        'treatment_plants.get_service_area': [
+            {'facility_id': fid} for fid in plants.column('facility_id').tolist()
+        ],
+    }
+
+
+def _route_sources(path):
+    """Config attribute names of the data files a route depends on"""
+    relative = path[len(Config.API_PREFIX):]
+    if relative.startswith('/treatment-plants/') and relative.endswith('/service-area'):
+        return SERVICE_AREA_SOURCES
+    for prefix, sources in ROUTE_SOURCES:
+        if relative == prefix or relative.startswith(prefix + '/'):
+            return sources
+    return ALL_SOURCES
+
+
+def collect_routes(app, data_service=None):
+    """List the URLs of all parameterless and per-entity GET routes under the API prefix"""
+    data_service = data_service or shared_data_service
+    entity_args = _entity_arguments(data_service)
+    urls = []
+
+    with app.test_request_context():
+        for rule in app.url_map.iter_rules():
+            if 'GET' not in rule.methods or rule.endpoint in EXCLUDED_ENDPOINTS:
+                continue
+            if not rule.rule.startswith(Config.API_PREFIX):
+                continue
+            if not rule.arguments:
+                urls.append(url_for(rule.endpoint))
+            elif rule.endpoint in entity_args:
+                for kwargs in entity_args[rule.endpoint]:
+                    urls.append(url_for(rule.endpoint, **kwargs))
+
+    return sorted(set(urls))
+
+
+def _output_path(output_dir, url):
+    return os.path.join(output_dir, *unquote(url).strip('/').split('/')) + '.json'
+
+
+def _write_atomic(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'routes': {}}
+
+
+def export_static(app, output_dir, force=False):
+    """
+    Render all static routes into output_dir.
+    Returns a summary dict with written, unchanged, skipped and removed routes.
+    A route that fails to render keeps its previous output; only routes that
+    no longer exist are removed.
+    """
+    manifest = _load_manifest(output_dir)
+    previous = manifest.get('routes', {})
+    routes = {}
+    summary = {'written': [], 'unchanged': [], 'skipped': [], 'removed': []}
+    client = app.test_client()
+
+    urls = collect_routes(app)
+    for url in urls:
+        source_names = _route_sources(url)
+        sources = [getattr(Config, name) for name in source_names]
+        version = shared_data_service.loaded_version(source_names)
+        file_path = _output_path(output_dir, url)
+        entry = previous.get(url)
+
+        if (not force and entry and entry.get('source_version') == version
+                and os.path.exists(file_path) and os.path.exists(file_path + '.gz')):
+            routes[url] = entry
+            summary['unchanged'].append(url)
+            continue
+
+        response = client.get(url)
+        if response.status_code != 200 or response.mimetype != 'application/json':
+            summary['skipped'].append(url)
+            if entry:
+                routes[url] = entry
+            continue
+
+        body = response.get_data()
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        _write_atomic(file_path, body)
+        _write_atomic(file_path + '.gz', compressed)
+
+        routes[url] = {
+            'file': os.path.relpath(file_path, output_dir),
+            'source_version': version,
+            'sources': [os.path.basename(path) for path in sources],
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'bytes': len(body),
+            'gzip_bytes': len(compressed),
+        }
+        summary['written'].append(url)
+
+    # Drop outputs for entities that no longer exist
+    current = set(urls)
+    for url, entry in previous.items():
+        if url not in current:
+            for suffix in ('', '.gz'):
+                stale = os.path.join(output_dir, entry['file'] + suffix)
+                if os.path.exists(stale):
+                    os.remove(stale)
+            summary['removed'].append(url)
+
+    manifest = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'api_prefix': Config.API_PREFIX,
+        'routes': routes,
+    }
+    _write_atomic(
+        os.path.join(output_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode()
+    )
+    return summary
+
+
+@click.command('export-static')
+@click.argument('output_dir', required=False, default=Config.STATIC_EXPORT_DIR)
+@click.option('--force', is_flag=True, help='Regenerate every route even if its data is unchanged.')
+def export_static_command(output_dir, force):
+    """Pre-render static API routes to OUTPUT_DIR for CDN serving"""
+    from flask import current_app
+    summary = export_static(current_app, output_dir, force=force)
+    click.echo(
+        f"Exported to {output_dir}: {len(summary['written'])} written, "
+        f"{len(summary['unchanged'])} unchanged, {len(summary['skipped'])} skipped, "
+        f"{len(summary['removed'])} removed"
+    )
+    for url in summary['skipped']:
+        click.echo(f"  skipped {url}")
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    app = create_app()
+    with app.app_context():
+        summary = export_static(
+            app,
+            args[0] if args else Config.STATIC_EXPORT_DIR,
+            force='--force' in sys.argv
+        )
+    print(json.dumps({key: len(value) for key, value in summary.items()}))
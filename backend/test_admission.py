@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Admission control tests
+Drive AdmissionController on a small Flask app whose handler blocks until
+released, so queueing and shedding happen deterministically. No server or
+data files needed.
+
+Usage:
+    python test_admission.py
+"""
+import threading
+import time
+import unittest
+
+from flask import Flask, jsonify
+
+from config import Config
+from api.admission import AdmissionController
+
+
+class BlockingApp:
+    """Flask app with one route that holds its worker until release() is called"""
+
+    def __init__(self, controller):
+        self.gate = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.app = Flask(__name__)
+        controller.init_app(self.app)
+        self.controller = controller
+
+        @self.app.route('/slow')
+        def slow():
+            self.started.release()
+            self.gate.wait(10)
+            return jsonify({'status': 'success'})
+
+        @self.app.route('/slow-expensive')
+        def slow_expensive():
+            return slow()
+
+        @self.app.route('/lookup')
+        def lookup():
+            return jsonify({'status': 'success'})
+
+    def request_async(self, results, path='/slow'):
+        def run():
+            response = self.app.test_client().get(path)
+            results.append((response.status_code, response.headers.get('Retry-After')))
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def release(self):
+        self.gate.set()
+
+
+class AdmissionTests(unittest.TestCase):
+    def controller(self, concurrency, queue, deadline_s=5.0):
+        return AdmissionController(
+            classes={'heavy': {'concurrency': concurrency, 'queue': queue,
+                               'deadline_s': deadline_s, 'retry_after_s': 3}},
+            default_class='heavy',
+            endpoint_classes={'other': 'heavy'},
+            escalations={'other': []},
+            exempt=('static',)
+        )
+
+    def wait_for_queue(self, controller, depth):
+        deadline = time.monotonic() + 5
+        while controller.metrics()['heavy']['queue_depth'] < depth:
+            self.assertLess(time.monotonic(), deadline, 'request never queued')
+            time.sleep(0.01)
+
+    def test_full_queue_is_shed_with_retry_after(self):
+        blocking = BlockingApp(self.controller(concurrency=1, queue=1))
+        results = []
+        threads = [blocking.request_async(results)]
+        blocking.started.acquire(timeout=5)
+        threads.append(blocking.request_async(results))
+        self.wait_for_queue(blocking.controller, 1)
+
+        response = blocking.app.test_client().get('/slow')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '3')
+
+        blocking.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [(200, None), (200, None)])
+        metrics = blocking.controller.metrics()['heavy']
+        self.assertEqual((metrics['admitted'], metrics['shed_queue_full'], metrics['in_flight']), (2, 1, 0))
+
+    def test_queued_request_is_shed_at_its_deadline(self):
+        blocking = BlockingApp(self.controller(concurrency=1, queue=4, deadline_s=0.2))
+        results = []
+        first = blocking.request_async(results)
+        blocking.started.acquire(timeout=5)
+
+        response = blocking.app.test_client().get('/slow')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(blocking.controller.metrics()['heavy']['shed_deadline'], 1)
+
+        blocking.release()
+        first.join()
+        self.assertEqual(results, [(200, None)])
+
+    def test_cheap_requests_keep_threads_while_heavy_classes_are_saturated(self):
+        controller = AdmissionController(
+            endpoint_classes={'slow': 'moderate', 'slow_expensive': 'expensive', 'lookup': 'cheap'},
+            escalations={'slow': []},
+            exempt=('static',)
+        )
+        moderate, expensive = controller.classes['moderate'], controller.classes['expensive']
+        held = moderate.concurrency + moderate.queue + expensive.concurrency + expensive.queue
+        # Every heavy request, running or queued, holds a worker thread
+        self.assertLessEqual(held, Config.WORKER_THREADS - Config.ADMISSION_RESERVED_THREADS)
+
+        blocking = BlockingApp(controller)
+        results = []
+        threads = [
+            blocking.request_async(results, '/slow')
+            for _ in range(moderate.concurrency + moderate.queue)
+        ] + [
+            blocking.request_async(results, '/slow-expensive')
+            for _ in range(expensive.concurrency + expensive.queue)
+        ]
+        deadline = time.monotonic() + 5
+        while moderate.in_flight + moderate.queued + expensive.in_flight + expensive.queued < held:
+            self.assertLess(time.monotonic(), deadline, 'requests never arrived')
+            time.sleep(0.01)
+
+        client = blocking.app.test_client()
+        self.assertEqual(client.get('/slow').status_code, 503)
+        self.assertEqual(client.get('/slow-expensive').status_code, 503)
+        self.assertEqual(client.get('/lookup').status_code, 200)
+
+        blocking.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([status for status, _ in results], [200] * held)
+        self.assertEqual((moderate.shed_queue_full, expensive.shed_queue_full), (1, 1))
+
+    def test_list_endpoints_are_cheap(self):
+        controller = AdmissionController()
+        for endpoint in ('counties.get_all_counties', 'counties.get_population_data',
+                         'water_quality.get_all_water_quality', 'treatment_plants.get_all_treatment_plants'):
+            self.assertEqual(controller.classify(endpoint, {}), 'cheap')
+        self.assertEqual(
+            controller.classify('treatment_plants.get_nearby_treatment_plants', {'radius': '500'}),
+            'expensive'
+        )
+        self.assertIsNone(controller.classify('metrics', {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,10 @@ import requests
 import json
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-BASE_URL = 'http://localhost:5001/api/v1'
+SERVER_URL = 'http://localhost:5001'
+BASE_URL = f'{SERVER_URL}/api/v1'
 
 class APITester:
     def __init__(self):
@@ -73,6 +75,109 @@ class APITester:
             self.errors.append(f"{endpoint}: {str(e)}")
             return None
     
+    def test_download(self, endpoint, expected_mimetype):
+        """Test a file download endpoint (non-JSON response)"""
+        print(f"\n{'='*60}")
+        print(f"Testing: GET {endpoint}")
+        print(f"{'='*60}")
+        try:
+            response = requests.get(f"{BASE_URL}{endpoint}", timeout=30)
+            content_type = response.headers.get('Content-Type', '')
+            print(f"Status Code: {response.status_code}")
+            print(f"Content-Type: {content_type}, {len(response.content)} bytes")
+            
+            if response.status_code == 200 and content_type.startswith(expected_mimetype):
+                print("✅ PASSED")
+                self.passed += 1
+            else:
+                print(f"❌ FAILED - Expected 200 {expected_mimetype}")
+                self.failed += 1
+                self.errors.append(f"{endpoint}: Status {response.status_code} {content_type}")
+        except Exception as e:
+            print(f"❌ FAILED - {str(e)}")
+            self.failed += 1
+            self.errors.append(f"{endpoint}: {str(e)}")
+    
+    def check(self, name, ok, detail=''):
+        """Record the result of a check that is not a single request"""
+        if ok:
+            print(f"✅ PASSED - {name}")
+            self.passed += 1
+        else:
+            print(f"❌ FAILED - {name} {detail}")
+            self.failed += 1
+            self.errors.append(f"{name}: {detail}")
+    
+    def test_admission(self):
+        """Concurrent requests: normal bursts are served, shed requests are counted and carry Retry-After"""
+        print(f"\n{'='*60}")
+        print("Testing: GET /metrics and concurrent bursts")
+        print(f"{'='*60}")
+        try:
+            metrics = requests.get(f"{SERVER_URL}/metrics", timeout=10).json()
+            self.check('/metrics', 'admission' in metrics and 'cache' in metrics, str(metrics)[:200])
+            admission = metrics.get('admission', {})
+            print(f"Admission control enabled: {admission.get('enabled')}")
+            
+            # A normal burst of list requests must not be shed
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                statuses = list(pool.map(
+                    lambda endpoint: requests.get(f"{BASE_URL}{endpoint}", timeout=30).status_code,
+                    ['/counties', '/treatment-plants'] * 4
+                ))
+            print(f"8 concurrent list requests: {statuses}")
+            self.check('burst of 8 list requests', statuses == [200] * 8, str(statuses))
+            
+            if not admission.get('enabled'):
+                return
+            
+            # Overload the expensive class (nearby with radius > 100): every 503 needs
+            # Retry-After and must show up in the shed counters
+            def shed_count():
+                classes = requests.get(f"{SERVER_URL}/metrics", timeout=10).json()['admission']['classes']
+                return classes['expensive']['shed_queue_full'] + classes['expensive']['shed_deadline']
+            
+            before = shed_count()
+            with ThreadPoolExecutor(max_workers=24) as pool:
+                responses = list(pool.map(
+                    lambda _: requests.get(f"{BASE_URL}/treatment-plants/nearby?lat=37&lng=-120&radius=500", timeout=60),
+                    range(24)
+                ))
+            shed = [r for r in responses if r.status_code == 503]
+            print(f"24 concurrent expensive requests: {len(shed)} shed")
+            self.check(
+                '503 responses carry Retry-After',
+                all(r.headers.get('Retry-After') for r in shed),
+                str([dict(r.headers) for r in shed][:1])
+            )
+            self.check(
+                'shed requests are counted in /metrics',
+                shed_count() - before == len(shed),
+                f'{shed_count() - before} counted, {len(shed)} shed'
+            )
+        except Exception as e:
+            self.check('/metrics and bursts', False, str(e))
+    
+    def test_query(self):
+        """/query: 501 when SQL_ENGINE is off, otherwise reads succeed and anything else is rejected"""
+        response = requests.get(f"{BASE_URL}/query", params={'sql': 'SELECT COUNT(*) FROM population'}, timeout=10)
+        print(f"\nSQL engine: status {response.status_code}")
+        if response.status_code == 501:
+            self.check('/query with SQL_ENGINE off', True)
+            return
+        self.check('/query read', response.status_code == 200, response.text[:200])
+        
+        rejected = [
+            'DELETE FROM population',
+            'SELECT 1; SELECT 2',
+            "SELECT * FROM read_csv('/etc/passwd')",
+            "SELECT * FROM read_text('/etc/passwd')",
+            "SELECT * FROM glob('/*')",
+        ]
+        for sql in rejected:
+            response = requests.get(f"{BASE_URL}/query", params={'sql': sql}, timeout=10)
+            self.check(f'/query rejects {sql}', response.status_code == 400, f'got {response.status_code}')
+    
     def run_all_tests(self):
         """Run comprehensive API tests"""
         
@@ -84,6 +189,7 @@ class APITester:
         counties_result = self.test_endpoint('/counties')
         self.test_endpoint('/counties/population')
         self.test_endpoint('/counties/boundaries')
+        self.test_endpoint('/counties/choropleth?metric=nitrate_avg_mg_per_L')
         
         # Test specific county if we have data
         if counties_result and 'data' in counties_result and len(counties_result['data']) > 0:
@@ -120,19 +226,56 @@ class APITester:
         self.test_endpoint('/treatment-plants/nearby?lat=37.7749&lng=-122.4194&radius=100')
         self.test_endpoint('/treatment-plants/nearby?lat=34.0522&lng=-118.2437&radius=50')
         
+        # Test grid service areas
+        self.test_endpoint('/treatment-plants/serving?lat=37.7749&lng=-122.4194')
+        self.test_endpoint('/treatment-plants/service-areas')
+        if plants_result and 'data' in plants_result and len(plants_result['data']) > 0:
+            facility_id = plants_result['data'][0]['facility_id']
+            self.test_endpoint(f'/treatment-plants/{facility_id}/service-area')
+        
         # Test county plants
         if counties_result and 'data' in counties_result and len(counties_result['data']) > 0:
             county_name = counties_result['data'][0]['county_name']
             self.test_endpoint(f'/treatment-plants/county/{county_name}')
         
-        # Test 4: Error handling
+        # Test 4: Search endpoint
+        print("\n🔎 TESTING SEARCH ENDPOINT")
+        self.test_endpoint('/search?q=san%20luis')
+        self.test_endpoint('/search?q=LA&limit=5')
+        self.test_endpoint('/search?q=sna%20luis')
+        self.test_endpoint('/search?q=alam&type=facility')
+        
+        # Test 5: Bulk export endpoints
+        print("\n📦 TESTING EXPORT ENDPOINTS")
+        self.test_download('/export/treatment-plants.csv?county=Kern', 'text/csv')
+        self.test_download('/export/water-quality.parquet?max_lead=5', 'application/vnd.apache.parquet')
+        self.test_download('/export/treatment-plants.fgb', 'application/flatgeobuf')
+        self.test_endpoint('/export/counties.csv', expected_status=400)
+        self.test_endpoint('/export/unknown.csv', expected_status=404)
+        
+        # Test 6: Error handling
         print("\n⚠️  TESTING ERROR HANDLING")
         self.test_endpoint('/counties/NonexistentCounty', expected_status=404)
         self.test_endpoint('/water-quality/NonexistentCounty', expected_status=404)
         self.test_endpoint('/treatment-plants/99999', expected_status=404)
         self.test_endpoint('/treatment-plants/nearby?lat=invalid', expected_status=400)
+        self.test_endpoint('/search', expected_status=400)
+        self.test_endpoint('/search?q=san&limit=0', expected_status=400)
+        self.test_endpoint('/counties/choropleth?metric=unknown', expected_status=400)
+        self.test_endpoint('/treatment-plants/serving?lat=10&lng=10', expected_status=404)
+        self.test_endpoint('/treatment-plants/serving?lat=nan&lng=-120', expected_status=400)
+        self.test_endpoint('/treatment-plants/serving?lat=37&lng=inf', expected_status=400)
+        self.test_endpoint('/treatment-plants/nearby?lat=nan&lng=-120', expected_status=400)
+        
+        # SQL query endpoint
+        print("\n🗄️  TESTING QUERY ENDPOINT")
+        self.test_query()
+        
+        # Test 7: Admission control
+        print("\n🚦 TESTING ADMISSION CONTROL")
+        self.test_admission()
         
-        # Test 5: Performance test
+        # Test 8: Performance test
         print("\n⚡ PERFORMANCE TEST")
         start_time = time.time()
         self.test_endpoint('/counties')
@@ -167,7 +310,7 @@ class APITester:
 def test_server_connectivity():
     """Test if the server is running"""
     try:
-        response = requests.get('http://localhost:5001', timeout=5)
+        response = requests.get(SERVER_URL, timeout=5)
         return True
     except:
         return False
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+CSV ingestion tests
+Load small CSV files through ingest_csv and check which rows are dropped,
+why, and on which file line they were reported. No server needed.
+
+Usage:
+    python test_ingestion.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from api.services.ingestion import ingest_csv
+
+SCHEMA = {
+    'facility_id': 'int32',
+    'county': 'category',
+    'latitude': 'float32',
+    'longitude': 'float32',
+}
+BOUNDS = {'latitude': (32.5, 42.05), 'longitude': (-124.5, -114.1)}
+
+
+class IngestionTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def ingest(self, text, **rules):
+        path = os.path.join(self.dir, 'plants.csv')
+        with open(path, 'w') as f:
+            f.write(text)
+        rules.setdefault('bounds', BOUNDS)
+        return ingest_csv(path, SCHEMA, **rules)
+
+    def reasons(self, report):
+        """(line, column, reason) of the reported rows, in file order"""
+        return sorted((row['line'], row['column'], row['reason']) for row in report.bad_rows)
+
+    def test_valid_file_is_typed(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '2,Kern,35.3,-118.9\n'
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1, 2])
+        self.assertEqual(str(df['facility_id'].dtype), 'int32')
+        self.assertEqual(str(df['county'].dtype), 'category')
+        self.assertEqual(str(df['latitude'].dtype), 'float32')
+        self.assertEqual((report.rows_read, report.rows_loaded, report.bad_row_count), (2, 2, 0))
+
+    def test_bad_numbers(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            'x,Kern,35.3,-118.9\n'
+            '3,Kern,north,-118.9\n'
+            '4.5,Kern,35.3,-118.9\n'
+            '99999999999,Kern,35.3,-118.9\n'
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1])
+        self.assertEqual(self.reasons(report), [
+            (3, 'facility_id', 'not a number'),
+            (4, 'latitude', 'not a number'),
+            (5, 'facility_id', 'not an integer'),
+            (6, 'facility_id', 'out of int32 range'),
+        ])
+
+    def test_out_of_range_and_missing_coordinates(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '2,Kern,10.0,-118.9\n'
+            '3,Kern,35.3,-100\n'
+            '4,Kern,,-118.9\n'
+            '5,Kern,35.3,\n'
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1])
+        self.assertEqual(self.reasons(report), [
+            (3, 'latitude', 'outside [32.5, 42.05]'),
+            (4, 'longitude', 'outside [-124.5, -114.1]'),
+            (5, 'latitude', 'missing value'),
+            (6, 'longitude', 'missing value'),
+        ])
+
+    def test_duplicate_ids_across_chunks(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '2,Kern,35.3,-118.9\n'
+            '3,Kern,35.3,-118.9\n'
+            '1,Kern,35.3,-118.9\n'
+            '2,Kern,35.3,-118.9\n',
+            chunk_size=2, unique=('facility_id',)
+        )
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(df['facility_id'].tolist(), [1, 2, 3])
+        self.assertEqual(df['county'].tolist(), ['Alameda', 'Kern', 'Kern'])
+        self.assertEqual(self.reasons(report), [
+            (5, 'facility_id', 'duplicate id'),
+            (6, 'facility_id', 'duplicate id'),
+        ])
+
+    def test_bad_row_does_not_hide_a_later_duplicate(self):
+        # Line numbers of the kept rows must stay aligned after bad rows are dropped
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '2,Kern,0,-118.9\n'
+            '3,Kern,35.3,-118.9\n'
+            '3,Kern,35.3,-118.9\n',
+            chunk_size=2, unique=('facility_id',)
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1, 3])
+        self.assertEqual(self.reasons(report), [
+            (3, 'latitude', 'outside [32.5, 42.05]'),
+            (5, 'facility_id', 'duplicate id'),
+        ])
+
+    def test_unknown_counties(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '2,Atlantis,35.3,-118.9\n'
+            '3,KERN,35.3,-118.9\n',
+            known_values={'county': {'alameda', 'kern'}}
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1, 3])
+        self.assertEqual(self.reasons(report), [(3, 'county', 'unknown value')])
+        self.assertEqual(report.bad_rows[0]['value'], 'Atlantis')
+
+    def test_line_numbers_count_blank_lines(self):
+        df, report = self.ingest(
+            'facility_id,county,latitude,longitude\n'
+            '1,Alameda,37.6,-121.7\n'
+            '\n'
+            '2,Kern,0,-118.9\n'
+        )
+        self.assertEqual(df['facility_id'].tolist(), [1])
+        self.assertEqual(report.rows_read, 2)
+        self.assertEqual(self.reasons(report), [(4, 'latitude', 'outside [32.5, 42.05]')])
+
+    def test_reported_rows_are_capped(self):
+        rows = ''.join(f'{i},Kern,0,-118.9\n' for i in range(10))
+        df, report = self.ingest('facility_id,county,latitude,longitude\n' + rows, max_reported=3)
+        self.assertEqual(len(df), 0)
+        self.assertEqual(report.bad_row_count, 10)
+        self.assertEqual([row['line'] for row in report.bad_rows], [2, 3, 4])
+
+    def test_schema_mismatch_aborts(self):
+        with self.assertRaises(ValueError):
+            self.ingest('facility_id,county,latitude\n1,Alameda,37.6\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+ColumnarTable tests
+Check that the column-wise JSON writer produces the same document as
+json.dumps over the row dicts, and that text columns survive the compact
+storage. No server or data files needed.
+
+Usage:
+    python test_records.py
+"""
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from api.services.records import ColumnarTable
+
+
+def sample_table():
+    return ColumnarTable.from_frame(pd.DataFrame({
+        'facility_id': np.arange(1000, 1006, dtype=np.int32),
+        'facility_name': ['Plant A', 'Plänt "B"', None, 'A long name with 50% of the text', 'E', 'F'],
+        'county': ['Kern', 'Kern', None, 'Alameda', 'Kern', 'Alameda'],
+        'latitude': np.array([37.6017, np.nan, 35.3, 36.0, np.inf, -np.inf], dtype=np.float32),
+        'flagged': [True, False, True, False, True, False],
+    }), categorical=('county',))
+
+
+class ColumnarTableTests(unittest.TestCase):
+    def test_to_json_matches_json_dumps_of_records(self):
+        table = sample_table()
+        for sort_keys in (False, True):
+            expected = json.dumps(table.to_records(), separators=(',', ':'), sort_keys=sort_keys)
+            self.assertEqual(table.to_json(sort_keys=sort_keys), expected)
+
+    def test_to_json_of_filtered_and_empty_tables(self):
+        table = sample_table()
+        kern = table.take(table.equals_ignore_case('county', 'kern'))
+        self.assertEqual([row['facility_id'] for row in json.loads(kern.to_json())], [1000, 1001, 1004])
+        self.assertEqual(table.take(np.zeros(len(table), dtype=bool)).to_json(), '[]')
+
+    def test_text_columns_keep_values_and_missing(self):
+        table = sample_table()
+        self.assertEqual(table.column('facility_name').tolist()[:3], ['Plant A', 'Plänt "B"', None])
+        self.assertEqual(table.find('facility_id', 1002)['facility_name'], None)
+        self.assertTrue(table.equals_ignore_case('facility_name', 'plant a')[0])
+        frame = table.to_frame()
+        self.assertEqual(frame['facility_name'].dtype, object)
+        self.assertEqual(frame['facility_name'].tolist()[3], 'A long name with 50% of the text')
+
+
+if __name__ == '__main__':
+    unittest.main()
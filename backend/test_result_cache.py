@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Result cache tests
+Exercise the two-level cache against the in-memory shared backend:
+stampede locking, waiting for another instance, and fallbacks when the
+shared tier fails. No server or Redis needed.
+
+Usage:
+    python test_result_cache.py
+"""
+import sys
+import threading
+import time
+import unittest
+import zlib
+from unittest import mock
+
+from config import Config
+from api.services import result_cache
+from api.services.result_cache import MemoryBackend, ResultCache, cached
+
+
+class BrokenBackend:
+    """Shared tier whose every call fails, like an unreachable Redis"""
+    name = 'broken'
+
+    def get(self, key):
+        raise ConnectionError('down')
+
+    def set(self, key, value, ttl=None, nx=False):
+        raise ConnectionError('down')
+
+    def delete_if_equal(self, key, value):
+        raise ConnectionError('down')
+
+
+class Counter:
+    def __init__(self, value=None, delay=0):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value if self.value is not None else {'rows': [1, 2, 3]}
+
+
+class ResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.shared = MemoryBackend()
+        self.key = 'test:x:v1:abc'
+
+    def test_local_hit_after_compute(self):
+        cache = ResultCache(self.shared)
+        compute = Counter()
+        self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(cache.metrics()['local']['hits'], 1)
+
+    def test_new_instance_reads_shared_tier(self):
+        ResultCache(self.shared).get_or_compute(self.key, Counter())
+        compute = Counter()
+        cold = ResultCache(self.shared)
+        self.assertEqual(cold.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(compute.calls, 0)
+        self.assertEqual(cold.metrics()['shared']['hits'], 1)
+
+    def test_stampede_computes_once_across_instances(self):
+        caches = [ResultCache(self.shared), ResultCache(self.shared)]
+        compute = Counter(delay=0.2)
+        threads = [
+            threading.Thread(target=cache.get_or_compute, args=(self.key, compute))
+            for cache in caches for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(compute.calls, 1)
+        self.assertIsNone(self.shared.get(self.key + ':lock'))
+
+    def test_waits_for_lock_holder(self):
+        self.shared.set(self.key + ':lock', 'other-instance', ttl=30, nx=True)
+        publish = threading.Timer(
+            0.1, self.shared.set, (self.key, zlib.compress(b'{"rows":[9]}'))
+        )
+        publish.start()
+        cache = ResultCache(self.shared)
+        compute = Counter()
+        self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [9]})
+        self.assertEqual(compute.calls, 0)
+        self.assertEqual(cache.lock_waits, 1)
+
+    def test_computes_when_lock_holder_never_publishes(self):
+        self.shared.set(self.key + ':lock', 'other-instance', ttl=30, nx=True)
+        cache = ResultCache(self.shared)
+        compute = Counter()
+        with mock.patch.object(Config, 'CACHE_LOCK_WAIT_S', 0.1):
+            self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(compute.calls, 1)
+        # Someone else's lock is left alone
+        self.assertEqual(self.shared.get(self.key + ':lock'), 'other-instance')
+
+    def test_lock_released_when_compute_fails(self):
+        cache = ResultCache(self.shared)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_compute(self.key, fail)
+        self.assertIsNone(self.shared.get(self.key + ':lock'))
+        self.assertIsNone(self.shared.get(self.key))
+
+    def test_unreachable_shared_tier_falls_back_to_compute(self):
+        cache = ResultCache(BrokenBackend())
+        compute = Counter()
+        self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(compute.calls, 1)
+        self.assertGreater(cache.metrics()['shared']['errors'], 0)
+
+    def test_corrupt_shared_value_is_recomputed(self):
+        self.shared.set(self.key, b'not zlib')
+        cache = ResultCache(self.shared)
+        compute = Counter()
+        self.assertEqual(cache.get_or_compute(self.key, compute), {'rows': [1, 2, 3]})
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(cache.metrics()['shared']['errors'], 1)
+
+    def test_large_and_unserializable_results_are_not_cached(self):
+        cache = ResultCache(self.shared)
+        with mock.patch.object(Config, 'CACHE_MAX_ITEM_BYTES', 10):
+            cache.get_or_compute(self.key, Counter(value=list(range(100))))
+        cache.get_or_compute('test:y', Counter(value={'value': object()}))
+        self.assertEqual(len(cache.local), 0)
+        self.assertIsNone(self.shared.get(self.key))
+        self.assertEqual(cache.uncacheable, 2)
+
+    def test_local_tier_is_bounded_by_bytes(self):
+        cache = ResultCache(max_bytes=100)
+        for i in range(10):
+            cache.get_or_compute(f'test:{i}', Counter(value='x' * 30))
+        self.assertLessEqual(cache.local.bytes, 100)
+        self.assertEqual(len(cache.local), 3)
+
+    def test_memory_backend_nx_and_ttl(self):
+        self.assertTrue(self.shared.set('k', 'a', ttl=0.05, nx=True))
+        self.assertFalse(self.shared.set('k', 'b', nx=True))
+        time.sleep(0.06)
+        self.assertIsNone(self.shared.get('k'))
+        self.assertTrue(self.shared.set('k', 'b', nx=True))
+        self.assertFalse(self.shared.delete_if_equal('k', 'a'))
+        self.assertTrue(self.shared.delete_if_equal('k', 'b'))
+
+
+class CachedDecoratorTests(unittest.TestCase):
+    class Service:
+        """Stands in for DataService: computes from a version it controls"""
+
+        def __init__(self):
+            self.version = 'v1'
+            self.calls = 0
+
+        def loaded_version(self, sources):
+            return self.version
+
+        @cached('decorated', ['POPULATION_DATA'])
+        def compute(self, value):
+            self.calls += 1
+            return {'value': value, 'version': self.version}
+
+    def setUp(self):
+        patcher = mock.patch.object(result_cache, '_cache', ResultCache(MemoryBackend()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend = mock.patch.object(Config, 'CACHE_BACKEND', 'memory')
+        backend.start()
+        self.addCleanup(backend.stop)
+
+    def test_keyed_on_arguments_and_loaded_version(self):
+        service = self.Service()
+        self.assertEqual(service.compute(1), {'value': 1, 'version': 'v1'})
+        service.compute(1)
+        service.compute(2)
+        self.assertEqual(service.calls, 2)
+
+        service.version = 'v2'
+        self.assertEqual(service.compute(1), {'value': 1, 'version': 'v2'})
+        self.assertEqual(service.calls, 3)
+
+
+class GetResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(result_cache, '_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unavailable_backend_falls_back_to_local_tier(self):
+        # redis configured but the package is missing: cached calls and metrics keep working
+        with mock.patch.object(Config, 'CACHE_BACKEND', 'redis'), \
+                mock.patch.dict(sys.modules, {'redis': None}), \
+                self.assertLogs(result_cache.logger, 'ERROR'):
+            cache = result_cache.get_result_cache()
+            self.assertIsNone(cache.shared)
+            self.assertIs(result_cache.get_result_cache(), cache)
+            self.assertEqual(cache.get_or_compute('test:x', Counter()), {'rows': [1, 2, 3]})
+            metrics = result_cache.cache_metrics()
+        self.assertEqual(metrics['backend'], 'local')
+        self.assertIn('redis package', metrics['shared_error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
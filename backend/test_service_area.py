@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Service area grid tests
+Build small grids with a land mask and check that masked cells are never
+served and that a cost surface built for another grid is ignored. No server
+or data files needed.
+
+Usage:
+    python test_service_area.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from api.services.service_area_service import ServiceAreaGrid, load_cost_surface, polygon_mask
+
+BOUNDS = (0.0, 10.0, 0.0, 10.0)
+
+
+class ServiceAreaTests(unittest.TestCase):
+    def test_polygon_mask_follows_rings_and_holes(self):
+        square = np.array([[2, 2], [8, 2], [8, 8], [2, 8]], dtype=float)
+        hole = np.array([[4, 4], [6, 4], [6, 6], [4, 6]], dtype=float)
+        mask = polygon_mask([square, hole], BOUNDS, 1.0)
+        self.assertEqual(mask.shape, (10, 10))
+        self.assertEqual(int(mask.sum()), 36 - 4)
+        self.assertTrue(mask[2, 2])
+        self.assertFalse(mask[4, 4])
+        self.assertFalse(mask[0, 0])
+
+    def test_cells_outside_the_mask_are_not_served(self):
+        land = polygon_mask([np.array([[0, 0], [5, 0], [5, 10], [0, 10]], dtype=float)], BOUNDS, 1.0)
+        grid = ServiceAreaGrid(BOUNDS, 1.0).restrict(land).build([5.5], [2.5])
+        self.assertEqual(grid.serving(5.5, 7.5), None)
+        self.assertEqual(grid.serving(9.5, 4.5)[0], 0)
+        self.assertEqual(grid.plant_summary(0)['cells'], 50)
+
+    def test_cost_surface_for_another_grid_is_ignored(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'cost.npy')
+        np.save(path, np.ones((20, 20), dtype=np.float32))
+        with self.assertLogs('api.services.service_area_service', 'ERROR'):
+            self.assertIsNone(load_cost_surface(path, (10, 10)))
+        self.assertEqual(load_cost_surface(path, (20, 20)).shape, (20, 20))
+        self.assertIsNone(load_cost_surface(os.path.join(tmp, 'missing.npy'), (10, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()